@@ -3,6 +3,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 from typing import List, Dict
 
+from recorder import load_record
+
 class Analytics:
     def __init__(self, game, bot_params):
         self.game = game
@@ -13,40 +15,202 @@ class Analytics:
         self.game_record = game.record
 
     def evaluate_pnl(self, bot_name):
-        """Calculate PnL for a specific bot."""
+        """
+        PnL for a specific bot if it unwound its positions now, crossing the real resting
+        liquidity (see Exchange.liquidation_value).
+        """
+        return self.game.exchange.mark_to_exit({bot_name: self.game.positions[bot_name]})[bot_name]
+    
+    @staticmethod
+    def load_record(path: str, columns: List[str] = None, start_loop: int = None, stop_loop: int = None) -> pd.DataFrame:
+        """
+        Open a saved game record without parsing it. Records written as a column directory
+        (Game(record_path="runs/seed_1")) or .npy are memory-mapped, so only the columns
+        and loops asked for are read; convert old CSVs once with recorder.convert_record.
+        """
+        return load_record(path, columns, start_loop, stop_loop)
+
+    def trade_columns(self, start_loop: int = None, stop_loop: int = None) -> Dict:
+        """Column views of the exchange trade log, optionally limited to loops [start_loop, stop_loop)."""
+        store = self.game.trade_log
+        if start_loop is None and stop_loop is None:
+            return store.to_numpy()
+        return store.loop_range(start_loop or 0, stop_loop if stop_loop is not None else np.iinfo(np.int64).max)
+
+    def volume(self, start_loop: int = None, stop_loop: int = None) -> pd.Series:
+        """Traded volume per ticker."""
+        cols = self.trade_columns(start_loop, stop_loop)
+        tickers = self.game.trade_log.ticker_names
+        volume = np.bincount(cols["ticker_id"], weights=cols["size"], minlength=len(tickers))
+        return pd.Series(volume, index=tickers, name="volume")
+
+    def vwap(self, start_loop: int = None, stop_loop: int = None) -> pd.Series:
+        """Volume weighted average trade price per ticker (NaN if it didn't trade)."""
+        cols = self.trade_columns(start_loop, stop_loop)
+        tickers = self.game.trade_log.ticker_names
+        notional = np.bincount(cols["ticker_id"], weights=cols["price"] * cols["size"], minlength=len(tickers))
+        volume = np.bincount(cols["ticker_id"], weights=cols["size"], minlength=len(tickers))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(notional / volume, index=tickers, name="vwap")
 
-        market_maker_params = self.bot_params["market_maker_params"]
+    def bot_fill_stats(self, start_loop: int = None, stop_loop: int = None) -> pd.DataFrame:
+        """Per-bot fill counts, bought/sold volume and average buy/sell prices, over all tickers."""
+        cols = self.trade_columns(start_loop, stop_loop)
+        bots = self.game.trade_log.bot_names
+        n = len(bots)
+        size = cols["size"]
+        notional = cols["price"] * size
+        agg_buy = cols["agg_side"] == 1
+        # the aggressor trades in agg_side, the resting bot in the opposite direction
+        buyer = np.where(agg_buy, cols["agg_bot_id"], cols["rest_bot_id"])
+        seller = np.where(agg_buy, cols["rest_bot_id"], cols["agg_bot_id"])
 
-        player_positions = self.game.positions[bot_name]
-        cash = player_positions["Cash"]
+        stats = pd.DataFrame({
+            "aggressive_fills": np.bincount(cols["agg_bot_id"], minlength=n),
+            "passive_fills": np.bincount(cols["rest_bot_id"], minlength=n),
+            "bought": np.bincount(buyer, weights=size, minlength=n),
+            "sold": np.bincount(seller, weights=size, minlength=n),
+            "buy_notional": np.bincount(buyer, weights=notional, minlength=n),
+            "sell_notional": np.bincount(seller, weights=notional, minlength=n),
+        }, index=bots)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stats["avg_buy_price"] = stats["buy_notional"] / stats["bought"]
+            stats["avg_sell_price"] = stats["sell_notional"] / stats["sold"]
+        return stats
 
-        for ticker in player_positions:
-            print(ticker)
-            if ticker == "Cash":
+    # ========== Vectorised PnL and Microstructure Metrics =========
+    # All of these work on whole columns of the game record and the trade log at once.
+
+    def record_frame(self) -> pd.DataFrame:
+        """The game record with missing mids filled forward, indexed by loop."""
+        df = self.game_record.full_frame()
+        if "Loop" not in df:
+            raise ValueError("The game record has no Loop column; keep it in Game(record_columns=...)")
+        tickers = [p.ticker for p in self.products if p.ticker in df]
+        df[tickers] = df[tickers].ffill()
+        return df.set_index("Loop")
+
+    def mark_to_market(self) -> pd.DataFrame:
+        """
+        Per-loop PnL of every bot: cash plus positions marked at the mid. One column per bot;
+        bots whose cash, positions or mids weren't all recorded (Game(record_columns=...)) are left out.
+        """
+        df = self.record_frame()
+        pnl = {}
+        for bot_name in self.game.bots:
+            needed = [f"{bot_name}_Cash"] + [f"{bot_name}_{p.ticker}" for p in self.products] + [p.ticker for p in self.products]
+            if any(column not in df for column in needed):
                 continue
-            product = self.tickers_to_products[ticker]
-            """going to equaliseas per the mm market impact. This seems pretty necesssary 
-            as I've got no position limits so otherwise you could do some weird stuff and 
-            trade like 100% of the volume i think idk but this is preventative and reasonable"""
-            if player_positions[ticker] > 0:
-                best_ask = g.exchange.display_book()[ticker]["Asks"][0]
-                first_trade_price = best_ask.price
-                # so level_size every mpv_frequencies * product.mpv
-                level_spacing = product.mpv * market_maker_params["mpv_frequencies"][ticker]
-                worst_trade_price = first_trade_price - level_spacing/market_maker_params["level_size"][ticker]
-                cash += player_positions[ticker] * (first_trade_price + worst_trade_price) / 2
-            elif player_positions[ticker] < 0:
-                best_bid = g.exchange.display_book()[ticker]["Bids"][0]
-                first_trade_price = best_bid.price
-                level_spacing = product.mpv * market_maker_params["mpv_frequencies"][ticker]
-                worst_trade_price = first_trade_price + level_spacing/market_maker_params["level_size"][ticker]
-                cash -= player_positions[ticker] * (first_trade_price + worst_trade_price) / 2
-        
-        return cash
-    
+            bot_pnl = df[f"{bot_name}_Cash"].copy()
+            for product in self.products:
+                bot_pnl += df[f"{bot_name}_{product.ticker}"] * df[product.ticker]
+            pnl[bot_name] = bot_pnl
+        if not pnl:
+            raise ValueError("No bot has its cash, positions and mids all in the game record")
+        return pd.DataFrame(pnl)
+
+    def drawdown(self, pnl: pd.DataFrame = None) -> pd.DataFrame:
+        """How far each bot's mark-to-market PnL is below its running peak, per loop (<= 0)."""
+        pnl = self.mark_to_market() if pnl is None else pnl
+        return pnl - pnl.cummax()
+
+    def inventory_turnover(self) -> pd.DataFrame:
+        """Traded volume / mean absolute position, per bot (rows) and ticker (columns)."""
+        df = self.record_frame()
+        cols = self.trade_columns()
+        store = self.game.trade_log
+        n_bots, n_tickers = len(store.bot_names), len(store.ticker_names)
+        size = cols["size"]
+        volume = (np.bincount(cols["agg_bot_id"] * n_tickers + cols["ticker_id"], weights=size, minlength=n_bots * n_tickers)
+                  + np.bincount(cols["rest_bot_id"] * n_tickers + cols["ticker_id"], weights=size, minlength=n_bots * n_tickers))
+        volume = pd.DataFrame(volume.reshape(n_bots, n_tickers), index=store.bot_names, columns=store.ticker_names)
+
+        turnover = {}
+        for product in self.products:
+            mean_abs = pd.Series({bot_name: df[f"{bot_name}_{product.ticker}"].abs().mean() for bot_name in self.game.bots
+                                  if f"{bot_name}_{product.ticker}" in df}, dtype=float)
+            traded = volume[product.ticker] if product.ticker in volume else 0.0
+            with np.errstate(invalid="ignore", divide="ignore"):
+                turnover[product.ticker] = traded.reindex(mean_abs.index, fill_value=0.0) / mean_abs
+        return pd.DataFrame(turnover)
+
+    def fill_ratio(self) -> pd.Series:
+        """Volume a bot got filled (as aggressor or resting) / volume it sent to the exchange."""
+        stats = self.bot_fill_stats()
+        filled = stats["bought"] + stats["sold"]
+        sent = pd.Series(self.game.exchange.order_volume, dtype=float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (filled.reindex(sent.index, fill_value=0.0) / sent).rename("fill_ratio")
+
+    def future_mids(self, trade_loops: np.ndarray, ticker_ids: np.ndarray, horizon: int) -> np.ndarray:
+        """
+        Mid of each trade's ticker at the first recorded loop at or after `horizon` loops past
+        the trade, so never a pre-trade mid even with record_every > horizon (NaN past the end).
+        """
+        df = self.record_frame()
+        missing = [ticker for ticker in self.game.trade_log.ticker_names if ticker not in df]
+        if missing:
+            raise ValueError(f"Mids of {missing} weren't recorded; keep them in Game(record_columns=...)")
+        loops = df.index.to_numpy()
+        mids = df[self.game.trade_log.ticker_names].to_numpy()
+        target = trade_loops + horizon
+        rows = np.searchsorted(loops, target, side="left")
+        out = mids[np.minimum(rows, len(loops) - 1), ticker_ids]
+        out[rows >= len(loops)] = np.nan
+        return out
+
+    def markouts(self, horizons=(1, 10, 100)) -> pd.DataFrame:
+        """
+        Average markout per unit traded for every bot at each horizon: how far the mid moved
+        in the bot's favour `h` loops after its fills. Positive is good for the bot. Fills with
+        no mid `h` loops later count in neither the moves nor the volume.
+        """
+        cols = self.trade_columns()
+        store = self.game.trade_log
+        n = len(store.bot_names)
+        size = cols["size"]
+        out = {}
+        for h in horizons:
+            move = (self.future_mids(cols["loop"], cols["ticker_id"], h) - cols["price"]) * cols["agg_side"] * size
+            valid = ~np.isnan(move)
+            agg, rest, move, valid_size = cols["agg_bot_id"][valid], cols["rest_bot_id"][valid], move[valid], size[valid]
+            volume = np.bincount(agg, weights=valid_size, minlength=n) + np.bincount(rest, weights=valid_size, minlength=n)
+            # the aggressor gains the move in its direction, the resting side the opposite
+            total = np.bincount(agg, weights=move, minlength=n) - np.bincount(rest, weights=move, minlength=n)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[f"markout_{h}"] = total / volume
+        return pd.DataFrame(out, index=store.bot_names)
+
+    def realised_spread(self, horizon: int = 10) -> pd.Series:
+        """
+        Size-weighted realised spread earned by each liquidity provider, 2 * D * (price - mid_{t+h})
+        with D = +1 when the aggressor bought, in price units.
+        """
+        cols = self.trade_columns()
+        store = self.game.trade_log
+        n = len(store.bot_names)
+        size = cols["size"]
+        spread = 2 * cols["agg_side"] * (cols["price"] - self.future_mids(cols["loop"], cols["ticker_id"], horizon))
+        valid = ~np.isnan(spread)
+        weighted = np.bincount(cols["rest_bot_id"][valid], weights=(spread * size)[valid], minlength=n)
+        volume = np.bincount(cols["rest_bot_id"][valid], weights=size[valid], minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(weighted / volume, index=store.bot_names, name=f"realised_spread_{horizon}")
+
+    def summary(self, horizons=(1, 10, 100)) -> pd.DataFrame:
+        """One row per bot: final and worst PnL, max drawdown, fill ratio, realised spread and markouts."""
+        pnl = self.mark_to_market()
+        out = pd.DataFrame({
+            "final_pnl": pnl.iloc[-1],
+            "min_pnl": pnl.min(),
+            "max_drawdown": self.drawdown(pnl).min(),
+        })
+        out = out.join(self.fill_ratio()).join(self.realised_spread(horizons[len(horizons) // 2])).join(self.markouts(horizons))
+        return out
+
     def plot_results(self, stocks: List):
         """Plot the mid prices for the given stocks over time, each with its own y-axis for proper scaling."""
-        df = pd.DataFrame(self.game_record)
+        df = self.game_record.full_frame()
         print(df.head(5))
         plt.figure(figsize=(12, 6))
         ax = plt.gca()
@@ -83,7 +247,7 @@ class Analytics:
 
     def upload_csv(self, filename="game_record.csv"):
         """Upload the game record to a CSV file."""
-        df = pd.DataFrame(self.game_record)
+        df = self.game_record.full_frame()
         df.to_csv(filename, index=False)
         print(f"Game record saved to {filename}")
 
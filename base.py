@@ -1,15 +1,21 @@
-from typing import List
-from time import time
+import math
+from typing import Dict, List
 
+import numpy as np
 from rich.console import Console
 from rich.table import Table
 
+from book import BookSide, BookView
+from trade_store import TradeStore
+from feed import MarketFeed
+
 
 class Order:
     """
     Order object representing an incoming market order.
     """
     MAPPING = {"Buy": 1, "Sell": -1}
+    __slots__ = ("ticker", "price", "size", "order_id", "agg_dir", "bot_name", "aggness", "tick")
 
     def __init__(self, ticker: str, price: float, size: int, order_id: int, agg_dir: str, bot_name: str):
         self.ticker = ticker
@@ -19,25 +25,44 @@ class Order:
         self.agg_dir = agg_dir
         self.bot_name = bot_name
         self.aggness = self.price * Order.MAPPING[self.agg_dir]
+        self.tick = None  # integer price in units of the product's mpv, set when the order is validated
 
     def __str__(self):
         return f'{self.bot_name} wants to {self.agg_dir} at {self.price}'
 
 
+class QuoteUpdate:
+    """
+    A bot's complete ladder for one ticker. Replaces whatever ladder the bot quoted
+    previously in a single exchange operation; levels whose price and size are
+    unchanged keep their resting order (and queue position).
+    """
+    def __init__(self, ticker: str, orders: List[Order], bot_name: str):
+        self.ticker = ticker
+        self.orders = orders
+        self.bot_name = bot_name
+
+    def __str__(self):
+        return f'{self.bot_name} quotes {len(self.orders)} levels in {self.ticker}'
+
+
 class Trade:
     """
-    Trade object for record-keeping executed trades.
+    Trade object for record-keeping executed trades. trade_time is the game loop the trade happened in.
     """
+    __slots__ = ("ticker", "price", "size", "agg_order_id", "agg_dir", "rest_order_id",
+                 "trade_time", "agg_bot", "rest_bot")
+
     def __init__(self, price: float, size: int, ticker: str,
                  agg_order_id: int, rest_order_id: int,
-                 agg_dir: str, agg_bot: str, rest_bot: str):
+                 agg_dir: str, agg_bot: str, rest_bot: str, trade_time: int = None):
         self.ticker = ticker
         self.price = price
         self.size = size
         self.agg_order_id = agg_order_id
         self.agg_dir = agg_dir
         self.rest_order_id = rest_order_id
-        self.trade_time = time()
+        self.trade_time = trade_time
         self.agg_bot = agg_bot
         self.rest_bot = rest_bot
 
@@ -48,9 +73,19 @@ class Trade:
 class Product:
     """
     Product metadata container (tick size, limits, etc.)
+
+    Prices are validated and matched as integer ticks of mpv: scale converts a price to
+    ticks and min_tick / max_tick are the price limits in ticks (unbounded as +-inf).
+
+    conversions is {target_ticker: ratio} or {target_ticker: (ratio, fee)}: one unit
+    converts into ratio units of target for fee cash. basket ({component_ticker: units})
+    makes the product an ETF that can be created from / redeemed into those components
+    for basket_fee cash per unit. See conversions.ConversionGraph.
     """
+    TICK_TOL = 1e-6  # how far (in ticks) a float price may be from the grid and still count as on it
+
     def __init__(self, ticker: str, mpv: float = 1, lot_size: int = 1,
-                 pos_limit=None, min_price=0, max_price=None, conversions=None):
+                 pos_limit=None, min_price=0, max_price=None, conversions=None, basket=None, basket_fee=0.0):
         self.ticker = ticker
         self.pos_limit = pos_limit
         self.min_price = min_price
@@ -58,6 +93,20 @@ class Product:
         self.mpv = mpv
         self.lot_size = lot_size
         self.conversions = conversions or {}
+        self.basket = basket or {}
+        self.basket_fee = basket_fee
+
+        self.scale = 1 / mpv
+        self.min_tick = math.ceil(min_price * self.scale - self.TICK_TOL) if min_price is not None else -math.inf
+        self.max_tick = math.floor(max_price * self.scale + self.TICK_TOL) if max_price is not None else math.inf
+
+    def to_tick(self, price: float):
+        """price in integer ticks, or None if it isn't a multiple of mpv."""
+        ticks = price * self.scale
+        tick = round(ticks)
+        if abs(ticks - tick) > self.TICK_TOL:
+            return None
+        return tick
 
     def __str__(self):
         return self.ticker
@@ -70,6 +119,8 @@ class Rest:
     """
     Resting order in the order book.
     """
+    __slots__ = ("size", "price", "order_id", "ticker", "aggness", "bot_name")
+
     def __init__(self, size: int, price: float, order_id: int,
                  ticker: str, aggness: float, bot_name: str):
         self.size = size
@@ -90,43 +141,163 @@ class Exchange:
     def __init__(self, products: List[Product]):
         self.products = products
         self.ticker_to_product = {p.ticker: p for p in self.products}
-        self.book = {p.ticker: {"Bids": [], "Asks": []} for p in self.products}
-        self.trade_log = []
+        self.book = {p.ticker: {"Bids": BookSide(1), "Asks": BookSide(-1)} for p in self.products}
+        self.book_view = BookView(self.book)  # what bots get to see
+        self.trade_log = TradeStore([p.ticker for p in self.products])
         self.mapping = {"Buy": 1, "Sell": -1}
         self.name_mapping = {"Buy": "Bids", "Sell": "Asks"}
-        self.order_ids = {}  # order_id → [ticker, side]
+        self.order_ids = {}  # order_id → (BookSide, PriceLevel, Rest) handle of a resting order
+        self.quotes = {}  # (bot_name, ticker) → {(agg_dir, tick): [order_id]} of the current ladder
         self.action_log = []
+        self.feed = None  # MarketFeed of book deltas, see enable_feed
+        self.order_volume = {}  # bot_name → total size sent in orders, for fill ratios
+        self.open_orders = {}  # (bot_name, ticker) → [resting buy size, resting sell size], kept up to date on every add/fill/cancel
     
     def process_order(self, loop_num, order: Order) -> List[Trade]:
 
-        if order.order_id in self.order_ids.keys():
+        if order.order_id in self.order_ids:
             raise ValueError("Already Seen OrderId. Please ensure that a new OrderId has been generated")
+        self.order_volume[order.bot_name] = self.order_volume.get(order.bot_name, 0) + order.size
         trades = []
         book = self.book[order.ticker]
         side_to_match = "Asks" if order.agg_dir == "Buy" else "Bids" # what side of the book to look at to try and match
         opposing_book = book[side_to_match]
-        while order.size > 0 and opposing_book:
-            rest = opposing_book[0]
-            price_match = (rest.price <= order.price+0.000001) if order.agg_dir == "Buy" else (rest.price >= order.price-0.000001)
-            if not price_match:
+        # Work in integer ticks so crossing is an exact comparison. The opposing side keys its
+        # levels by tick * its own direction, so -key is the level price in the aggressor's terms
+        tick = order.tick if order.tick is not None else self.to_tick(order.ticker, order.price)
+        order_key = tick * self.mapping[order.agg_dir]
+        keys = opposing_book.keys
+        rest_side = 1 if order.agg_dir == "Buy" else 0  # index of the resting orders' side in open_orders
+        while order.size > 0 and keys:
+            if -keys[-1] > order_key:
                 break
+            level = opposing_book.levels[-keys[-1] * self.mapping[order.agg_dir]]
+            rest = level.orders[0]
 
             trade_size = min(order.size, rest.size)
-            trade = self.record_trade(rest.price, trade_size, order, rest)
+            trade = self.record_trade(rest.price, trade_size, order, rest, loop_num)
             trades.append(trade)
 
             order.size -= trade_size
-            rest.size -= trade_size
+            opposing_book.fill_front(level, trade_size)
+            self.open_orders[(rest.bot_name, order.ticker)][rest_side] -= trade_size
+            if self.feed is not None:
+                self.feed.publish("FILL", order.ticker, side_to_match, rest.price, trade_size)
 
             if rest.size == 0:
-                opposing_book.pop(0)
+                opposing_book.pop_best()
+                del self.order_ids[rest.order_id]
 
         if order.size > 0:
             self.add_order(order)
 
         return trades
 
-    def record_trade(self, price: float, size: int, order: Order, rest: Rest) -> Trade:
+    def update_quotes(self, loop_num, quote: QuoteUpdate) -> List[Trade]:
+        """
+        Swap a bot's ladder for quote.ticker. Only levels that differ from the resting
+        ladder are cancelled and re-sent; the rest of the book is left untouched.
+        """
+        key = (quote.bot_name, quote.ticker)
+        old_ladder = self.quotes.pop(key, {})
+        wanted = {}
+        for order in quote.orders:
+            tick = order.tick if order.tick is not None else self.to_tick(order.ticker, order.price)
+            wanted.setdefault((order.agg_dir, tick), []).append(order)
+
+        ladder = {}
+        to_send = []
+        for level_key, orders in wanted.items():
+            old_ids = old_ladder.pop(level_key, None)
+            if old_ids is not None:
+                resting = [self.order_ids[i][2].size if i in self.order_ids else 0 for i in old_ids]
+                if resting == [order.size for order in orders]:
+                    ladder[level_key] = old_ids
+                    continue
+                for order_id in old_ids:
+                    self.remove_order(order_id)
+            to_send.append((level_key, orders))
+
+        for old_ids in old_ladder.values():
+            for order_id in old_ids:
+                self.remove_order(order_id)
+
+        trades = []
+        for level_key, orders in to_send:
+            for order in orders:
+                trades += self.process_order(loop_num, order)
+                if order.order_id in self.order_ids:
+                    ladder.setdefault(level_key, []).append(order.order_id)
+
+        self.quotes[key] = ladder
+        return trades
+
+    def liquidation_cost(self, ticker: str, agg_dir: str, size):
+        """
+        Exact VWAP of crossing `size` lots against the current book: a "Sell" walks the
+        Bids, a "Buy" the Asks. Returns (vwap, filled), where filled is less than size
+        when the side doesn't hold that much. size may be an array of sizes.
+        The side's cumulative depth is cached until it changes, so each query is a bisect.
+        """
+        depth = self.book[ticker]["Bids" if agg_dir == "Sell" else "Asks"].depth()
+        vwap, filled = depth.vwap(size), np.minimum(size, depth.total_volume)
+        if np.ndim(size) == 0:
+            return float(vwap), int(filled)
+        return vwap, filled
+
+    def liquidation_value(self, ticker: str, position):
+        """
+        Cash from flattening `position` (scalar or array) at the current book: longs are
+        sold into the Bids, shorts bought back from the Asks (a negative value).
+        Any part beyond the resting depth is valued at that side's last price level;
+        NaN if the side needed is empty.
+        """
+        position = np.asarray(position)
+        values = np.full(position.shape, np.nan)
+        values[position == 0] = 0.0
+        for sign, side in ((1, "Bids"), (-1, "Asks")):
+            mask = position * sign > 0
+            if not mask.any():
+                continue
+            depth = self.book[ticker][side].depth()
+            if not len(depth.prices):
+                continue
+            size = np.abs(position[mask])
+            notional, filled = depth.notional(size)
+            values[mask] = sign * (notional + (size - filled) * depth.prices[-1])
+        return values if values.ndim else float(values)
+
+    def mark_to_exit(self, positions: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+        """
+        PnL of every bot if it flattened all of its positions against the current book,
+        from a Game.positions style {bot: {ticker: position, "Cash": cash}} dict.
+        All bots are valued in one pass per ticker.
+        """
+        bots = list(positions)
+        pnl = np.array([positions[bot]["Cash"] for bot in bots], dtype=float)
+        for ticker in self.book:
+            held = np.array([positions[bot].get(ticker, 0) for bot in bots])
+            if held.any():
+                pnl += self.liquidation_value(ticker, held)
+        return dict(zip(bots, pnl.tolist()))
+
+    def quote_volume(self, bot_name: str, ticker: str):
+        """(buy size, sell size) still resting in the bot's current quote ladder for ticker."""
+        buys = sells = 0
+        order_ids = self.order_ids
+        for (agg_dir, _), ids in self.quotes.get((bot_name, ticker), {}).items():
+            size = sum(order_ids[i][2].size for i in ids if i in order_ids)
+            if agg_dir == "Buy":
+                buys += size
+            else:
+                sells += size
+        return buys, sells
+
+    def to_tick(self, ticker: str, price: float) -> int:
+        """Nearest tick to price, for orders that didn't come through Game validation."""
+        return round(price * self.ticker_to_product[ticker].scale)
+
+    def record_trade(self, price: float, size: int, order: Order, rest: Rest, loop_num: int = None) -> Trade:
         trade = Trade(
             price=price,
             size=size,
@@ -135,46 +306,45 @@ class Exchange:
             rest_order_id=rest.order_id,
             agg_dir=order.agg_dir,
             agg_bot=order.bot_name,
-            rest_bot=rest.bot_name
+            rest_bot=rest.bot_name,
+            trade_time=loop_num
         )
-        self.trade_log.append(trade)
+        self.trade_log.append(loop_num, order.ticker, price, size, order.agg_dir, order.bot_name, rest.bot_name)
         return trade
 
     def remove_order(self, order_id: int) -> bool:
         """
-        Need the order_id to cancel an order. Have stored the path in self.order_ids
+        Need the order_id to cancel an order. Have stored a handle to the resting order in self.order_ids
         """
-        info = self.order_ids.get(order_id)
-        if not info:
-            return False
-        ticker, side = info
-        book = self.book[ticker][side]
-        for idx, rest in enumerate(book):
-            if rest.order_id == order_id:
-                book.pop(idx)
-                return "Order Cancelled"
-        return "Cancellation Failed"
+        handle = self.order_ids.pop(order_id, None)
+        if handle is None:
+            return False  # unknown, already filled or already cancelled
+        book_side, level, rest = handle
+        self.open_orders[(rest.bot_name, rest.ticker)][0 if book_side.direction == 1 else 1] -= rest.size
+        if self.feed is not None:
+            self.feed.publish("CANCEL", rest.ticker, "Bids" if book_side.direction == 1 else "Asks", rest.price, rest.size)
+        book_side.cancel(level, rest)
+        return "Order Cancelled"
 
     def add_order(self, order: Order):
-        
-        self.order_ids[order.order_id] = [order.ticker, self.name_mapping[order.agg_dir]] #mapping to help with removal
         rest = Rest(order.size, order.price, order.order_id, order.ticker,
                     order.price * self.mapping[order.agg_dir], order.bot_name)
-
-        book = self.book[order.ticker]["Bids"] if order.agg_dir == "Buy" else self.book[order.ticker]["Asks"]
-
-        for idx, item in enumerate(book):
-            if order.aggness > item.aggness:
-                book.insert(idx, rest)
-                return
-            elif order.aggness == item.aggness:
-                insert_idx = idx
-                while insert_idx + 1 < len(book) and book[insert_idx + 1].aggness == order.aggness:
-                    insert_idx += 1
-                book.insert(insert_idx + 1, rest)
-                return
-
-        book.append(rest)
+        book_side = self.book[order.ticker][self.name_mapping[order.agg_dir]]
+        tick = order.tick if order.tick is not None else self.to_tick(order.ticker, order.price)
+        level = book_side.add(tick, rest)
+        self.order_ids[order.order_id] = (book_side, level, rest) #handle for O(1) removal
+        open_orders = self.open_orders.get((order.bot_name, order.ticker))
+        if open_orders is None:
+            open_orders = self.open_orders[(order.bot_name, order.ticker)] = [0, 0]
+        open_orders[0 if order.agg_dir == "Buy" else 1] += order.size
+        if self.feed is not None:
+            self.feed.publish("ADD", order.ticker, self.name_mapping[order.agg_dir], order.price, order.size)
+
+    def enable_feed(self, keep_history: bool = False) -> MarketFeed:
+        """Start publishing ADD / CANCEL / FILL events for every book change."""
+        if self.feed is None:
+            self.feed = MarketFeed(keep_history)
+        return self.feed
 
     def display_book(self):
         console = Console()
@@ -190,8 +360,8 @@ class Exchange:
             table.add_column("Size", justify="left", style="red")
             table.add_column("Bot (Ask)", justify="left", style="red")
 
-            bids = sides.get("Bids", [])
-            asks = sides.get("Asks", [])
+            bids = list(sides["Bids"])
+            asks = list(sides["Asks"])
             max_len = max(len(bids), len(asks))
             bids += [None] * (max_len - len(bids))
             asks += [None] * (max_len - len(asks))
@@ -0,0 +1,180 @@
+"""
+Benchmark suite for the exchange and the game loop, with results saved as JSON so
+runs on different commits can be compared.
+
+    python bench.py --out bench_results.json
+    python bench.py --out new.json --compare bench_results.json
+
+Measures
+- Exchange.process_order throughput at several book depths: passive adds, aggressive
+  sweeps through `sweep_levels` levels (replenished after each sweep) and cancels of
+  resting orders at random levels (each followed by a re-add)
+- messages per second through Game.game_loop for the playing.py scenario
+- end-to-end loops per second for the same scenario (bot_parameters.json, seeded)
+
+Every timing is the best of `repeats` runs.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Dict
+
+from base import Exchange, Order, Product
+from bench_book import MID, SIZE, build
+from game import Game
+from runner import make_bots
+from your_algo import PlayerAlgorithm
+
+
+def best_of(repeats: int, bench, *args) -> float:
+    return min(bench(*args) for _ in range(repeats))
+
+
+def passive_adds(depth: int, n: int) -> float:
+    """Orders per second resting at random levels behind the touch."""
+    exchange, order_id = build(Exchange, depth)
+    rng = random.Random(0)
+    orders = [Order("BNCH", MID - 1 - rng.randrange(depth), SIZE, order_id + i, "Buy", "bench") for i in range(n)]
+    start = perf_counter()
+    for order in orders:
+        exchange.process_order(0, order)
+    return n / (perf_counter() - start)
+
+
+def sweeps(depth: int, n: int, sweep_levels: int = 5) -> float:
+    """Aggressive orders per second, each taking the best `sweep_levels` bid levels whole."""
+    exchange, order_id = build(Exchange, depth)
+    sweep_levels = min(sweep_levels, depth)
+    elapsed = 0.0
+    for _ in range(n):
+        order = Order("BNCH", MID - sweep_levels, SIZE * sweep_levels, order_id, "Sell", "bench")
+        order_id += 1
+        start = perf_counter()
+        exchange.process_order(0, order)
+        elapsed += perf_counter() - start
+        for i in range(sweep_levels):  # put the book back, untimed
+            exchange.add_order(Order("BNCH", MID - 1 - i, SIZE, order_id, "Buy", "mm"))
+            order_id += 1
+    return n / elapsed
+
+
+def cancels(depth: int, n: int) -> float:
+    """Cancel + re-add pairs per second at random levels."""
+    exchange, order_id = build(Exchange, depth)
+    rng = random.Random(0)
+    resting = [2 * i for i in range(depth)]  # id of the bid resting at each level
+    picks = [rng.randrange(depth) for _ in range(n)]
+    start = perf_counter()
+    for i in picks:
+        exchange.remove_order(resting[i])
+        exchange.process_order(0, Order("BNCH", MID - 1 - i, SIZE, order_id, "Buy", "mm"))
+        resting[i] = order_id
+        order_id += 1
+    return n / (perf_counter() - start)
+
+
+def scenario(iterations: int, seed: int = 0) -> Dict[str, float]:
+    """Play the playing.py game and return loops/s and messages/s through game_loop."""
+    with open("bot_parameters.json") as f:
+        bot_params = json.load(f)
+    products = [Product("UEC", mpv=0.1)]
+    player = PlayerAlgorithm(products)
+    bots = [player] + make_bots(bot_params, products)
+    game = Game(products, bots, player_bots=[player.name], seed=seed)
+
+    # count the messages each bot sends; one counter bump per bot turn
+    counts = [0]
+    for bot in bots:
+        def counted(*args, send=bot.send_messages):
+            result = send(*args)
+            messages = result if isinstance(result, list) else result[0]
+            counts[0] += len(messages)
+            return result
+        bot.send_messages = counted
+
+    start = perf_counter()
+    game.play_game(iterations)
+    elapsed = perf_counter() - start
+    return {
+        "loops_per_s": iterations / elapsed,
+        "messages_per_s": counts[0] / elapsed,
+        "messages": counts[0],
+        "trades": len(game.trade_log),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(depths=(20, 200, 2000), n=2000, iterations=5000, repeats=3) -> Dict:
+    results = {"exchange": {}, "game": {}}
+    for depth in depths:
+        results["exchange"][str(depth)] = {
+            "passive_adds_per_s": best_of(repeats, passive_adds, depth, n),
+            "sweeps_per_s": best_of(repeats, sweeps, depth, n),
+            "cancels_per_s": best_of(repeats, cancels, depth, n),
+        }
+    runs = [scenario(iterations) for _ in range(repeats)]
+    best = max(runs, key=lambda run: run["loops_per_s"])
+    results["game"] = dict(best, iterations=iterations)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif key.endswith("_per_s"):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(new: Dict, old: Dict):
+    """Print new vs old throughput for every metric both runs have (higher is better)."""
+    new_flat, old_flat = flatten(new["results"]), flatten(old["results"])
+    print(f"{'metric':<36} {old.get('commit') or 'old':>12} {new.get('commit') or 'new':>12} {'change':>8}")
+    for metric, value in new_flat.items():
+        if metric in old_flat:
+            print(f"{metric:<36} {old_flat[metric]:>12.0f} {value:>12.0f} {value / old_flat[metric] - 1:>+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the exchange and the game loop.")
+    parser.add_argument("--out", default=None, help="write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run to compare against")
+    parser.add_argument("--depths", default="20,200,2000")
+    parser.add_argument("--n", type=int, default=2000, help="operations per exchange benchmark")
+    parser.add_argument("--iterations", type=int, default=5000, help="game loops for the scenario")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    report = run_all(tuple(int(d) for d in args.depths.split(",")), args.n, args.iterations, args.repeats)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark of the price-level book engine against the old list-backed book.
+
+Run with `python bench_book.py`. For each depth we rest `depth` levels a side and time
+- passive inserts at random resting levels
+- best-price lookups (book["Bids"][0].price, what every bot does each loop)
+- fills: a sell that takes the whole best bid, then a replenishing bid at the same price
+- cancels of resting orders at random levels, then re-adding them
+"""
+import random
+from time import perf_counter
+from typing import List
+
+from base import Exchange, Order, Product, Rest, Trade
+
+
+class ListExchange(Exchange):
+    """The original Exchange: sorted python lists, linear insert and pop(0) on fills."""
+    def __init__(self, products: List[Product]):
+        super().__init__(products)
+        self.book = {p.ticker: {"Bids": [], "Asks": []} for p in self.products}
+
+    def process_order(self, loop_num, order: Order) -> List[Trade]:
+        trades = []
+        book = self.book[order.ticker]
+        opposing_book = book["Asks"] if order.agg_dir == "Buy" else book["Bids"]
+        while order.size > 0 and opposing_book:
+            rest = opposing_book[0]
+            price_match = (rest.price <= order.price+0.000001) if order.agg_dir == "Buy" else (rest.price >= order.price-0.000001)
+            if not price_match:
+                break
+            trade_size = min(order.size, rest.size)
+            trades.append(self.record_trade(rest.price, trade_size, order, rest))
+            order.size -= trade_size
+            rest.size -= trade_size
+            if rest.size == 0:
+                opposing_book.pop(0)
+        if order.size > 0:
+            self.add_order(order)
+        return trades
+
+    def remove_order(self, order_id: int) -> bool:
+        ticker, side = self.order_ids[order_id]
+        book = self.book[ticker][side]
+        for idx, rest in enumerate(book):
+            if rest.order_id == order_id:
+                book.pop(idx)
+                return "Order Cancelled"
+        return "Cancellation Failed"
+
+    def add_order(self, order: Order):
+        self.order_ids[order.order_id] = [order.ticker, self.name_mapping[order.agg_dir]]
+        rest = Rest(order.size, order.price, order.order_id, order.ticker,
+                    order.price * self.mapping[order.agg_dir], order.bot_name)
+        book = self.book[order.ticker]["Bids"] if order.agg_dir == "Buy" else self.book[order.ticker]["Asks"]
+        for idx, item in enumerate(book):
+            if order.aggness > item.aggness:
+                book.insert(idx, rest)
+                return
+            elif order.aggness == item.aggness:
+                insert_idx = idx
+                while insert_idx + 1 < len(book) and book[insert_idx + 1].aggness == order.aggness:
+                    insert_idx += 1
+                book.insert(insert_idx + 1, rest)
+                return
+        book.append(rest)
+
+
+MID = 100000
+SIZE = 10
+
+
+def build(exchange_class, depth):
+    exchange = exchange_class([Product("BNCH")])
+    order_id = 0
+    for i in range(depth):
+        exchange.add_order(Order("BNCH", MID - 1 - i, SIZE, order_id, "Buy", "mm"))
+        exchange.add_order(Order("BNCH", MID + 1 + i, SIZE, order_id + 1, "Sell", "mm"))
+        order_id += 2
+    return exchange, order_id
+
+
+def time_inserts(exchange_class, depth, n):
+    exchange, order_id = build(exchange_class, depth)
+    rng = random.Random(0)
+    prices = [MID - 1 - rng.randrange(depth) for _ in range(n)]
+    start = perf_counter()
+    for price in prices:
+        exchange.add_order(Order("BNCH", price, SIZE, order_id, "Buy", "bench"))
+        order_id += 1
+    return (perf_counter() - start) / n
+
+
+def time_best(exchange_class, depth, n):
+    exchange, _ = build(exchange_class, depth)
+    book = exchange.book["BNCH"]
+    start = perf_counter()
+    for _ in range(n):
+        book["Bids"][0].price
+        book["Asks"][0].price
+    return (perf_counter() - start) / n
+
+
+def time_fills(exchange_class, depth, n):
+    exchange, order_id = build(exchange_class, depth)
+    start = perf_counter()
+    for _ in range(n):
+        exchange.process_order(0, Order("BNCH", MID - 1, SIZE, order_id, "Sell", "bench"))
+        exchange.add_order(Order("BNCH", MID - 1, SIZE, order_id + 1, "Buy", "mm"))
+        order_id += 2
+    return (perf_counter() - start) / n
+
+
+def time_cancels(exchange_class, depth, n):
+    exchange, order_id = build(exchange_class, depth)
+    rng = random.Random(0)
+    resting = [2 * i for i in range(depth)]  # id of the bid resting at each level
+    picks = [rng.randrange(depth) for _ in range(n)]
+    start = perf_counter()
+    for i in picks:
+        exchange.remove_order(resting[i])
+        exchange.add_order(Order("BNCH", MID - 1 - i, SIZE, order_id, "Buy", "mm"))
+        resting[i] = order_id
+        order_id += 1
+    return (perf_counter() - start) / n
+
+
+def main(depths=(20, 200, 2000), n=2000):
+    print(f"{'depth':>6} {'operation':>10} {'list (us)':>12} {'levels (us)':>12} {'speedup':>8}")
+    for depth in depths:
+        for name, bench in (("insert", time_inserts), ("best", time_best), ("fill", time_fills),
+                            ("cancel", time_cancels)):
+            old = bench(ListExchange, depth, n) * 1e6
+            new = bench(Exchange, depth, n) * 1e6
+            print(f"{depth:>6} {name:>10} {old:>12.2f} {new:>12.2f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
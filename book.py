@@ -0,0 +1,374 @@
+from bisect import bisect_left
+from collections import deque, namedtuple
+from collections.abc import Mapping
+from itertools import islice
+from types import MappingProxyType
+
+import numpy as np
+
+
+class PriceLevel:
+    """
+    FIFO queue of Rest objects at one price. Cancelled orders are marked with size 0 and
+    left in place until they reach the front, so `count` is the number of live orders
+    and `volume` their total size. The front of a non-empty level is always live.
+    A level whose dead entries come to outnumber its live orders is compacted.
+    """
+    __slots__ = ("tick", "orders", "count", "volume")
+
+    def __init__(self, tick: int):
+        self.tick = tick
+        self.orders = deque()
+        self.count = 0
+        self.volume = 0
+
+    def __iter__(self):
+        for rest in self.orders:
+            if rest.size > 0:
+                yield rest
+
+    def purge_front(self):
+        orders = self.orders
+        while orders and orders[0].size == 0:
+            orders.popleft()
+        if len(orders) > 2 * self.count + 16:
+            self.orders = deque(rest for rest in orders if rest.size > 0)
+
+
+class DepthProfile:
+    """
+    Cumulative depth of one book side at a point in time, most aggressive level first:
+    prices[i] is level i's price, cum_volume[i] and cum_notional[i] the size and
+    price * size resting at levels 0..i. Crossing any size is then one bisect.
+    """
+    __slots__ = ("prices", "cum_volume", "cum_notional")
+
+    def __init__(self, prices: np.ndarray, volumes: np.ndarray):
+        self.prices = prices
+        self.cum_volume = np.cumsum(volumes)
+        self.cum_notional = np.cumsum(prices * volumes)
+
+    @property
+    def total_volume(self) -> int:
+        return int(self.cum_volume[-1]) if len(self.cum_volume) else 0
+
+    def notional(self, size):
+        """
+        Cash exchanged for taking `size` lots off this side (scalar or array), and how
+        many lots could actually be filled. Sizes beyond the total depth fill only the depth.
+        """
+        size = np.minimum(size, self.total_volume)
+        # first level whose cumulative volume reaches size: everything before it is taken whole
+        idx = np.searchsorted(self.cum_volume, size, side="left")
+        idx = np.minimum(idx, len(self.prices) - 1)
+        prev_volume = np.where(idx > 0, self.cum_volume[idx - 1], 0)
+        prev_notional = np.where(idx > 0, self.cum_notional[idx - 1], 0.0)
+        return prev_notional + (size - prev_volume) * self.prices[idx], size
+
+    def vwap(self, size):
+        """Average price for crossing `size` lots (over the part that can be filled); NaN for none."""
+        if not len(self.prices):
+            return np.full(np.shape(size), np.nan) if np.ndim(size) else np.nan
+        notional, filled = self.notional(size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return notional / filled
+
+
+class BookSide:
+    """
+    One side of an order book, indexed by integer price level (ticks of Product.mpv).
+
+    Each level is a PriceLevel FIFO. The sorted level index keeps the best level at
+    the end of the list, so best-price lookup, fills and removing an emptied best
+    level are O(1), and a new level is placed with a bisect. Emptied levels behind
+    the best are only marked stale in the index and skipped, so unlinking them is
+    O(1) too; the index is compacted once stale keys outnumber live levels.
+
+    Iterating (or indexing) a BookSide yields the resting orders most aggressive ->
+    least aggressive, exactly like the old Bids/Asks lists, so bots can keep using
+    book["Bids"][0].price, book["Asks"][:n] etc.
+    """
+    def __init__(self, direction: int):
+        self.direction = direction  # 1 for Bids, -1 for Asks
+        self.levels = {}  # tick → PriceLevel
+        self.keys = []  # tick * direction, ascending, best level last
+        self.stale = set()  # keys still in self.keys whose level has been unlinked
+        self.order_count = 0
+        self.top = None  # front order of the best level, so book[side][0] is one attribute read
+        self.version = 0  # bumped on every change to this side
+        self.depth_cache = None  # (version, DepthProfile)
+
+    def add(self, tick: int, rest) -> PriceLevel:
+        level = self.levels.get(tick)
+        if level is None:
+            level = PriceLevel(tick)
+            self.levels[tick] = level
+            key = tick * self.direction
+            if key in self.stale:
+                self.stale.discard(key)
+            elif not self.keys or key > self.keys[-1]:
+                self.keys.append(key)
+                self.top = rest  # new best level
+            else:
+                self.keys.insert(bisect_left(self.keys, key), key)
+        level.orders.append(rest)
+        level.count += 1
+        level.volume += rest.size
+        self.order_count += 1
+        self.version += 1
+        return level
+
+    def best_tick(self):
+        if not self.keys:
+            return None
+        return self.keys[-1] * self.direction
+
+    def best_level(self):
+        if not self.keys:
+            return None
+        return self.levels[self.keys[-1] * self.direction]
+
+    def pop_best(self):
+        """Remove the front order of the best level, unlinking the level once it is empty."""
+        level = self.levels[self.keys[-1] * self.direction]
+        rest = level.orders.popleft()
+        level.count -= 1
+        level.volume -= rest.size
+        self.order_count -= 1
+        self.version += 1
+        if level.count == 0:
+            self.unlink(level)
+        else:
+            level.purge_front()
+        self.refresh_top()
+        return rest
+
+    def cancel(self, level: PriceLevel, rest):
+        """O(1) removal of a resting order given its level handle."""
+        level.volume -= rest.size
+        rest.size = 0
+        level.count -= 1
+        self.order_count -= 1
+        self.version += 1
+        if level.count == 0:
+            self.unlink(level)
+        else:
+            level.purge_front()
+        if rest is self.top:
+            self.refresh_top()
+
+    def refresh_top(self):
+        keys = self.keys
+        self.top = self.levels[keys[-1] * self.direction].orders[0] if keys else None
+
+    def fill_front(self, level: PriceLevel, size: int):
+        """Reduce the front order of a level by a partial or full fill of `size`."""
+        level.orders[0].size -= size
+        level.volume -= size
+        self.version += 1
+
+    def unlink(self, level: PriceLevel):
+        del self.levels[level.tick]
+        keys = self.keys
+        key = level.tick * self.direction
+        if keys[-1] != key:
+            self.stale.add(key)
+            if len(self.stale) > len(self.levels) + 16:
+                keys[:] = [k for k in keys if k not in self.stale]
+                self.stale.clear()
+            return
+        keys.pop()
+        while keys and keys[-1] in self.stale:
+            self.stale.discard(keys.pop())
+
+    def iter_levels(self):
+        """Yield PriceLevels most aggressive -> least aggressive."""
+        levels = self.levels
+        for key in reversed(self.keys):
+            level = levels.get(key * self.direction)
+            if level is not None:
+                yield level
+
+    def depth(self) -> DepthProfile:
+        """Cumulative depth of this side, rebuilt only when the side has changed since the last call."""
+        cache = self.depth_cache
+        if cache is not None and cache[0] == self.version:
+            return cache[1]
+        n = len(self.levels)
+        prices = np.empty(n, dtype=np.float64)
+        volumes = np.empty(n, dtype=np.int64)
+        for i, level in enumerate(self.iter_levels()):
+            prices[i] = level.orders[0].price
+            volumes[i] = level.volume
+        profile = DepthProfile(prices, volumes)
+        self.depth_cache = (self.version, profile)
+        return profile
+
+    def __iter__(self):
+        for level in self.iter_levels():
+            yield from level
+
+    def __len__(self):
+        return self.order_count
+
+    def __bool__(self):
+        return self.order_count > 0
+
+    def __getitem__(self, idx):
+        if idx == 0:
+            top = self.top
+            if top is not None:
+                return top
+            raise IndexError("book index out of range")
+        if isinstance(idx, slice):
+            if idx.step is None and (idx.start or 0) >= 0 and (idx.stop is None or idx.stop >= 0):
+                return list(islice(self, idx.start, idx.stop))
+            return list(self)[idx]
+        if idx < 0:
+            idx += self.order_count
+        if 0 <= idx < self.order_count:
+            return next(islice(self, idx, None))
+        raise IndexError("book index out of range")
+
+    def __eq__(self, other):
+        if isinstance(other, (BookSide, list)):
+            if not self.order_count or not other:
+                return not self.order_count and not other  # the bots' `== []` checks, without building a list
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"BookSide({list(self)!r})"
+
+
+class RestView(namedtuple("RestView", ("size", "price", "order_id", "ticker", "aggness", "bot_name"))):
+    """Immutable copy of a resting order, as bots see it."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"Price: {self.price}, Size: {self.size}"
+
+
+def rest_view(rest) -> RestView:
+    return RestView(rest.size, rest.price, rest.order_id, rest.ticker, rest.aggness, rest.bot_name)
+
+
+class SideView:
+    """
+    Read-only face of a BookSide for bots. It indexes, slices, iterates and compares
+    like the BookSide, but has none of its mutating methods and hands out RestView
+    copies of the orders, so nothing a bot does can reach the exchange's book. The
+    copy of the best order is kept until the side changes.
+    """
+    __slots__ = ("side", "top", "top_version")
+
+    def __init__(self, side: BookSide):
+        self.side = side
+        self.top = None
+        self.top_version = None
+
+    def __getitem__(self, idx):
+        side = self.side
+        if idx == 0:
+            if self.top_version != side.version:
+                if side.top is None:
+                    raise IndexError("book index out of range")
+                self.top = rest_view(side.top)
+                self.top_version = side.version
+            return self.top
+        if isinstance(idx, slice):
+            return [rest_view(rest) for rest in side[idx]]
+        return rest_view(side[idx])
+
+    def __iter__(self):
+        for rest in self.side:
+            yield rest_view(rest)
+
+    def __len__(self):
+        return self.side.order_count
+
+    def __bool__(self):
+        return self.side.order_count > 0
+
+    def __eq__(self, other):
+        if isinstance(other, SideView):
+            other = other.side
+        if isinstance(other, list) and not other:
+            return not self.side.order_count
+        if isinstance(other, (BookSide, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"SideView({list(self)!r})"
+
+
+class BookView(Mapping):
+    """
+    Read-only view of an exchange's books for bots. Nothing is copied up front: it
+    reads the live BookSides through SideViews, so it is always current, and bots
+    only ever get RestView copies of the orders.
+
+    It still behaves like the old {ticker: {"Bids": [...], "Asks": [...]}} dict, so
+    book[ticker]["Bids"][0].price keeps working, and adds O(1) best prices, top-N
+    aggregated levels as NumPy arrays and a per-ticker version counter.
+    """
+    def __init__(self, book: dict):
+        self._book = book
+        self._sides = {ticker: MappingProxyType({side: SideView(book_side) for side, book_side in sides.items()})
+                       for ticker, sides in book.items()}
+
+    def __reduce__(self):
+        # the read-only views can't be pickled; they are rebuilt over the unpickled book
+        return BookView, (self._book,)
+
+    def __getitem__(self, ticker):
+        return self._sides[ticker]
+
+    def __iter__(self):
+        return iter(self._sides)
+
+    def __len__(self):
+        return len(self._sides)
+
+    def version(self, ticker: str) -> int:
+        """Changes whenever the ticker's book changes; compare against a stored value to skip work."""
+        sides = self._book[ticker]
+        return sides["Bids"].version + sides["Asks"].version
+
+    def best_bid(self, ticker: str):
+        bids = self._book[ticker]["Bids"]
+        return bids[0].price if bids else None
+
+    def best_ask(self, ticker: str):
+        asks = self._book[ticker]["Asks"]
+        return asks[0].price if asks else None
+
+    def mid(self, ticker: str):
+        sides = self._book[ticker]
+        if sides["Bids"] and sides["Asks"]:
+            return (sides["Bids"][0].price + sides["Asks"][0].price) / 2
+        return None
+
+    def spread(self, ticker: str):
+        sides = self._book[ticker]
+        if sides["Bids"] and sides["Asks"]:
+            return sides["Asks"][0].price - sides["Bids"][0].price
+        return None
+
+    def levels(self, ticker: str, side: str, n: int):
+        """
+        Top n price levels of one side ("Bids" or "Asks"), most aggressive first, as
+        (prices, sizes) arrays with each level's resting size summed.
+        """
+        book_side = self._book[ticker][side]
+        prices = np.empty(n, dtype=np.float64)
+        sizes = np.empty(n, dtype=np.int64)
+        count = 0
+        for level in book_side.iter_levels():
+            if count == n:
+                break
+            prices[count] = level.orders[0].price
+            sizes[count] = level.volume
+            count += 1
+        return prices[:count], sizes[:count]
@@ -1,5 +1,6 @@
-from base import Exchange, Trade, Order, Product
-import random
+from base import Exchange, Trade, Order, Product, QuoteUpdate
+from rng import RandomStream
+from scheduler import Pending, SentimentBeyond, Timer, Traded
 import numpy as np
 
 
@@ -32,9 +33,10 @@ class MarketMaker:
         self.name = name
 
         self.open_orders = {ticker: {} for ticker in self.tickers}
+        self.quoted = {ticker: None for ticker in self.tickers}  # mid tick of the ladder resting on the exchange
+        self.ladders = {}  # (ticker, mid tick) → ladder levels
         self.mapping = {"Buy": 1, "Sell": -1}
         self.reset_status()
-        self.sent_orders = {t: [] for t in self.tickers}
 
         if realisation_effect is None:
             self.realisation_effect = {p.ticker: 0.005 for p in products}
@@ -55,37 +57,63 @@ class MarketMaker:
 
             if self.status[ticker]:
 
-                desired_mid = self.mids[ticker] - self.positions[ticker]/self.level_size[ticker] * (self.mpv_frequencies[ticker] * self.ticker_to_product[ticker].mpv)
-                desired_mid = self.round_to_mpv(desired_mid, self.ticker_to_product[ticker].mpv)
-
-                for id in self.sent_orders[ticker]:
-                    removal = Msg("REMOVE", id)
-                    outputs.append(removal)
-
-                self.sent_orders[ticker] = []
-                
-                for i in range(0,self.level_count):
-                    bid_price = desired_mid - i * self.mpv_frequencies[ticker] * self.ticker_to_product[ticker].mpv - self.initial_width_mpv[ticker] * self.ticker_to_product[ticker].mpv
-                    if bid_price > 0:
-                        bid_price = self.round_to_mpv(bid_price, self.ticker_to_product[ticker].mpv)
-                        bid = Order(ticker, bid_price, self.level_size[ticker], self.idx, "Buy", self.name)
-
-                        outputs += [Msg("ORDER", bid)]
-                        self.sent_orders[ticker].append(self.idx)
-                        self.idx += 1
-                    
-
-                    sell_price = max(10, desired_mid + i*self.mpv_frequencies[ticker] * self.ticker_to_product[ticker].mpv + self.initial_width_mpv[ticker] * self.ticker_to_product[ticker].mpv)
-                    sell_price = self.round_to_mpv(sell_price, self.ticker_to_product[ticker].mpv)
-                    ask = Order(ticker, sell_price, self.level_size[ticker], self.idx, "Sell", self.name)
-
-                    outputs += [Msg("ORDER", ask)]
-                    self.sent_orders[ticker].append(self.idx)
+                mpv = self.ticker_to_product[ticker].mpv
+                desired_mid = self.mids[ticker] - self.positions[ticker]/self.level_size[ticker] * (self.mpv_frequencies[ticker] * mpv)
+                mid_tick = round(desired_mid / mpv)
 
+                # The resting ladder is still the one we want: nothing to send
+                if self.quoted[ticker] == mid_tick:
+                    continue
+                self.quoted[ticker] = mid_tick
+
+                # The whole ladder goes out as one QUOTE_UPDATE; the exchange keeps any level that hasn't changed
+                ladder = []
+                for price, tick, agg_dir in self.ladder_levels(ticker, mid_tick):
+                    order = Order(ticker, price, self.level_size[ticker], self.idx, agg_dir, self.name)
+                    order.tick = tick
+                    ladder.append(order)
                     self.idx += 1
 
+                outputs.append(Msg("QUOTE_UPDATE", QuoteUpdate(ticker, ladder, self.name)))
+
 
         return outputs, sentiments, realisation
+
+    def wake_conditions(self):
+        # the ladder only moves with our position, i.e. when we trade
+        return [Traded(), Pending()]
+
+    def pending(self):
+        """A ladder needs (re)sending: nothing quoted yet, or one of our levels has been hit."""
+        return any(self.status[ticker] and self.quoted[ticker] is None for ticker in self.tickers)
+
+    def process_rejection(self, message, reason):
+        # a rejected ladder never went out, so send it again next turn
+        if isinstance(message, QuoteUpdate):
+            self.quoted[message.ticker] = None
+
+    def ladder_levels(self, ticker, mid_tick):
+        """
+        (price, tick, agg_dir) of every level of the ladder around mid_tick, bid then ask
+        for each level outwards. Worked out once per (ticker, mid tick) as tick arrays.
+        """
+        key = (ticker, mid_tick)
+        levels = self.ladders.get(key)
+        if levels is None:
+            mpv = self.ticker_to_product[ticker].mpv
+            offsets = np.arange(self.level_count) * self.mpv_frequencies[ticker] + self.initial_width_mpv[ticker]
+            bid_ticks = np.rint(mid_tick - offsets).astype(np.int64)
+            ask_ticks = np.maximum(round(10 / mpv), np.rint(mid_tick + offsets).astype(np.int64))  # asks floored at 10
+            bid_prices = np.round(bid_ticks * mpv, 4)
+            ask_prices = np.round(ask_ticks * mpv, 4)
+            levels = []
+            for bid_tick, bid_price, ask_tick, ask_price in zip(bid_ticks.tolist(), bid_prices.tolist(),
+                                                                 ask_ticks.tolist(), ask_prices.tolist()):
+                if bid_tick > 0:
+                    levels.append((bid_price, bid_tick, "Buy"))
+                levels.append((ask_price, ask_tick, "Sell"))
+            self.ladders[key] = levels
+        return levels
                 
     @staticmethod
     def round_to_mpv(num, interval):
@@ -102,6 +130,7 @@ class MarketMaker:
             else:
                 return realisation
             self.positions[trade.ticker] += trade.size * mm_dir
+            self.quoted[trade.ticker] = None  # a level has been hit, so the ladder needs refreshing
             if mm_dir == 1: # MM has bought
                 if realisation[trade.ticker] <= -0.01:
                     realisation[trade.ticker] += trade.size * self.realisation_effect[trade.ticker]
@@ -134,6 +163,7 @@ class RandomTrader:
         self.positions = {p.ticker: 0 for p in products}
         self.mapping = {"Buy": 1, "Sell": -1}
         self.sent_orders = []
+        self.rng = RandomStream()  # the game replaces this with a seeded stream, see set_rng
         self.max_sizes = max_sizes
 
 
@@ -166,6 +196,9 @@ class RandomTrader:
     def set_idx(self, idx):
         self.idx = idx
 
+    def set_rng(self, rng):
+        self.rng = rng
+
     def send_messages(self, book_state, sentiments, realisation, loop_num):
         messages = []
 
@@ -180,20 +213,20 @@ class RandomTrader:
         for ticker in book_state:
             
             if realisation[ticker] > 0.01 and book_state[ticker]["Asks"]:
-                correction_order = Order(ticker, book_state[ticker]["Asks"][0].price, int(np.random.normal(book_state[ticker]["Asks"][0].size, 2)), self.idx, "Buy", self.name)
+                correction_order = Order(ticker, book_state[ticker]["Asks"][0].price, int(self.rng.normal(book_state[ticker]["Asks"][0].size, 2)), self.idx, "Buy", self.name)
                 messages.append(Msg("ORDER", correction_order))
                 self.sent_orders.append(self.idx)
                 self.idx += 1
                 continue
             elif realisation[ticker] < -0.01 and book_state[ticker]["Bids"]:
 
-                correction_order = Order(ticker, book_state[ticker]["Bids"][0].price, int(np.random.normal(book_state[ticker]["Bids"][0].size, 2)), self.idx, "Sell", self.name)
+                correction_order = Order(ticker, book_state[ticker]["Bids"][0].price, int(self.rng.normal(book_state[ticker]["Bids"][0].size, 2)), self.idx, "Sell", self.name)
                 messages.append(Msg("ORDER", correction_order))
                 self.sent_orders.append(self.idx)
                 self.idx += 1
                 continue
             
-            if random.random() > self.freq:
+            if self.rng.random() > self.freq:
                 continue  # skip this tick. This just determines how frequently the bot trades
             if abs(sentiments[ticker]) < self.sentiment_limits[ticker]:
                 print(loop_num)
@@ -206,7 +239,7 @@ class RandomTrader:
 
                 spread_mpvs = spread / product.mpv
 
-                trade_dir = random.choices(["Buy", "Sell"], weights=[self.bias[ticker] + sentiments[ticker] * self.sentiment_effect[ticker], 1 - self.bias[ticker] - sentiments[ticker] * self.sentiment_effect[ticker]])[0]
+                trade_dir = self.rng.choices(["Buy", "Sell"], weights=[self.bias[ticker] + sentiments[ticker] * self.sentiment_effect[ticker], 1 - self.bias[ticker] - sentiments[ticker] * self.sentiment_effect[ticker]])
                 trade_size = self.determine_sizing(spread_mpvs, ticker)
                     
                 if trade_dir == "Sell":
@@ -249,7 +282,7 @@ class RandomTrader:
     
     def determine_sizing(self, spread_mpv, ticker):
         mean_size = min(self.sizing_factor / max(spread_mpv, 1e-6), self.max_sizes[ticker])
-        sampled_size = np.random.exponential(mean_size)
+        sampled_size = self.rng.exponential(mean_size)
         return max(1, int(sampled_size))  # Ensure at least size 1
 
     def process_trades(self, trades, realisation):
@@ -261,7 +294,9 @@ class RandomTrader:
         return realisation
     
     def process_conversions(self, conversion):
-        pass
+        for ticker, delta in conversion.deltas.items():
+            if ticker in self.positions:
+                self.positions[ticker] += delta
 
 class Reverter:
     def __init__(self, products, name, max_sizes = None, bias=None, sizing_factor=1.0, sentiment_influence=0.0, freq=0.01):
@@ -271,6 +306,7 @@ class Reverter:
         self.positions = {p.ticker: 0 for p in products}
         self.mapping = {"Buy": 1, "Sell": -1}
         self.sent_orders = []
+        self.rng = RandomStream()  # the game replaces this with a seeded stream, see set_rng
         self.max_sizes = max_sizes if max_sizes is not None else {p.ticker: 50 for p in products}
         # Per-ticker parameters
         tickers = [p.ticker for p in products]
@@ -281,18 +317,25 @@ class Reverter:
 
     def set_idx(self, idx):
         self.idx = idx
+
+    def set_rng(self, rng):
+        self.rng = rng
+
+    def wake_conditions(self):
+        # nothing to do while sentiment is inside +-0.05
+        return [SentimentBeyond(p.ticker, 0.05) for p in self.products]
     
     def send_messages(self, book_state, sentiments, realisation, loop_num):
         messages = []
         for ticker in book_state:
             if sentiments[ticker] < 0.05 and sentiments[ticker] > -0.05:
                 continue
-            if random.random() > self.freq[ticker]:
+            if self.rng.random() > self.freq[ticker]:
                 continue
-            trade_dir = random.choices(
+            trade_dir = self.rng.choices(
                 ["Buy", "Sell"],
                 weights=[self.bias[ticker] + 2*sentiments[ticker], 1 - self.bias[ticker] - 2*sentiments[ticker]]
-            )[0]
+            )
             product = self.tickers_to_products_[ticker]
             if book_state[ticker]["Bids"] == [] or book_state[ticker]["Asks"] == []:
                 continue
@@ -314,7 +357,7 @@ class Reverter:
 
     def determine_sizing(self, spread_mpv, ticker):
         mean_size = min(self.sizing_factor[ticker] / max(spread_mpv, 1e-6), self.max_sizes[ticker])
-        sampled_size = np.random.exponential(mean_size)
+        sampled_size = self.rng.exponential(mean_size)
         return max(1, int(sampled_size))  # Ensure at least size 1
     @staticmethod
     def round_to_mpv(num, interval):
@@ -356,6 +399,7 @@ class Taker:
         self.positions = {p.ticker: 0 for p in products}
         self.mapping = {"Buy": 1, "Sell": -1}
         self.sent_orders = []
+        self.rng = RandomStream()  # the game replaces this with a seeded stream, see set_rng
 
         # Per-ticker parameters
         tickers = [p.ticker for p in products]
@@ -364,11 +408,38 @@ class Taker:
         self.sentiment_influence = sentiment_influence if sentiment_influence is not None else {t: 0.0 for t in tickers}
         self.freq = freq if freq is not None else {t: 0.01 for t in tickers}
         self.max_levels = max_levels if max_levels is not None else {t: 3 for t in tickers}
+        self.next_fire = None  # ticker → loop of the next trade, once a scheduler drives the bot
 
         self.realisation_effect = 1
     def set_idx(self, idx):
         self.idx = idx
 
+    def set_rng(self, rng):
+        self.rng = rng
+
+    def wake_conditions(self):
+        return [Timer(), Pending()]
+
+    def pending(self):
+        return bool(self.sent_orders)  # cancels to send
+
+    def next_wake(self, loop_num):
+        """
+        Loop of the next trade at or after loop_num. The first call switches the bot from a
+        freq coin flip every loop to geometric gaps between trades (the same distribution).
+        """
+        if self.next_fire is None:
+            self.next_fire = {ticker: loop_num - 1 + self.rng.geometric(freq) for ticker, freq in self.freq.items()}
+        return min(self.next_fire.values())
+
+    def fires(self, ticker, loop_num):
+        if self.next_fire is None:
+            return self.rng.random() <= self.freq[ticker]
+        if loop_num < self.next_fire[ticker]:
+            return False
+        self.next_fire[ticker] = loop_num + self.rng.geometric(self.freq[ticker])
+        return True
+
     def send_messages(self, book_state, sentiments, realisation, loop_num):
         messages = []
         for id in self.sent_orders:
@@ -376,7 +447,7 @@ class Taker:
             messages.append(removal)
         self.sent_orders = []
         for ticker in book_state:
-            if random.random() > self.freq[ticker]:
+            if not self.fires(ticker, loop_num):
                 continue
             if realisation[ticker] != 0:
                 continue
@@ -384,10 +455,10 @@ class Taker:
                 continue
 
             product = self.tickers_to_products_[ticker]
-            trade_dir = random.choices(
+            trade_dir = self.rng.choices(
                 ["Buy", "Sell"],
                 weights=[self.bias[ticker], 1 - self.bias[ticker]]
-            )[0]
+            )
             max_levels = self.max_levels[ticker]
             total_size = 0
             price = None
@@ -400,7 +471,7 @@ class Taker:
                 if book_density > 0:
                     price_spread = abs(price - book_state[ticker]["Bids"][0].price)/product.mpv + 10
                     size = book_density * self.sizing_factor[ticker] * 1/price_spread
-                    size = int(np.random.normal(size, 1))
+                    size = int(self.rng.normal(size, 1))
                     order = Order(ticker, price, size, self.idx, "Buy", self.name)
                     messages.append(Msg("ORDER", order))
                     self.sent_orders.append(self.idx)
@@ -415,7 +486,7 @@ class Taker:
                 if book_density  > 0:
                     price_spread = abs(price - book_state[ticker]["Asks"][0].price)/product.mpv + 10
                     size = book_density * self.sizing_factor[ticker] * 1/price_spread
-                    size = int(np.random.normal(size, 1))
+                    size = int(self.rng.normal(size, 1))
                     order = Order(ticker, price, size, self.idx, "Sell", self.name)
                     messages.append(Msg("ORDER", order))
                     self.sent_orders.append(self.idx)
@@ -434,4 +505,6 @@ class Taker:
         return realisation
     
     def process_conversions(self, conversion):
-        pass
\ No newline at end of file
+        for ticker, delta in conversion.deltas.items():
+            if ticker in self.positions:
+                self.positions[ticker] += delta
\ No newline at end of file
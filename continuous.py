@@ -0,0 +1,154 @@
+"""
+Continuous-time version of the game, driven by an event heap.
+
+Time runs in loop units (loop k covers [k, k + 1)). Every bot wakes every `interval`,
+starting at its phase, looks at the book as it is at that instant and decides. Its
+messages leave after its decision latency and reach the exchange after its network
+delay (plus optional exponential jitter), where they are processed in arrival-time
+order. Trade reports travel back to each bot with that bot's network delay.
+
+With zero latencies and phases this plays exactly like the turn-based Game.
+"""
+import heapq
+from time import perf_counter
+
+from game import Game
+from rng import RandomStream
+
+
+class ContinuousGame(Game):
+    RECORD, WAKE, ARRIVE, DELIVER = range(4)  # at equal times, a loop is recorded before anything in the next one
+
+    def __init__(self, products, bots, latency=None, phases=None, interval=1.0, jitter=0.0, **kwargs):
+        """
+        latency: {bot_name: (decision_latency, network_delay)}, missing bots have none
+        phases: {bot_name: offset in [0, interval) of the bot's first wake-up}
+        jitter: mean of the exponential extra delay on every message each way
+        Any other keyword goes to Game, except schedule (bots wake on their own clocks here)
+        and record_flow (replay.ReplayGame replays turns, not timed events).
+        """
+        if kwargs.get("schedule"):
+            raise ValueError("ContinuousGame doesn't support schedule=True; bots wake every `interval` instead")
+        if kwargs.get("record_flow") is not None:
+            raise ValueError("ContinuousGame doesn't support record_flow; flow logs are replayed turn by turn")
+        super().__init__(products, bots, **kwargs)
+        latency = latency or {}
+        phases = phases or {}
+        self.decision_latency = {name: latency.get(name, (0.0, 0.0))[0] for name in self.bots}
+        self.network_delay = {name: latency.get(name, (0.0, 0.0))[1] for name in self.bots}
+        self.phases = {name: phases.get(name, 0.0) for name in self.bots}
+        self.interval = interval
+        self.jitter = jitter
+        # jitter comes from its own stream per bot, so it doesn't disturb the bots' own draws
+        self.network_rngs = {name: RandomStream.for_bot(self.seed, f"{name}/network") for name in self.bots} if jitter else {}
+        self.instant_reports = not jitter and not any(self.network_delay.values())
+
+        self.events = []  # (time, kind, seq, payload)
+        self.seq = 0  # tie-break in push order; a plain int so snapshots pickle it
+        self.now = 0.0
+        self.trade_times = []  # exchange time of every trade, in trade_log order
+
+    def push(self, time, kind, payload):
+        self.seq += 1
+        heapq.heappush(self.events, (time, kind, self.seq, payload))
+
+    def delay(self, bot_name):
+        delay = self.network_delay[bot_name]
+        if self.jitter:
+            delay += self.network_rngs[bot_name].exponential(self.jitter)
+        return delay
+
+    def reseed(self, seed):
+        super().reseed(seed)
+        if getattr(self, "jitter", 0):
+            self.network_rngs = {name: RandomStream.for_bot(seed, f"{name}/network") for name in self.bots}
+
+    def play_game(self, iterations):
+        start = self.loop
+        if not self.started:
+            self.initialise_game()
+            for bot_name in self.bots:
+                self.push(start + self.phases[bot_name], self.WAKE, bot_name)
+            self.started = True
+        self.record.start(iterations)
+        self.push(start + 1, self.RECORD, start)
+        wall_start = perf_counter()
+        try:
+            self.run(start + iterations)
+        finally:
+            self.flush()
+        if self.timer is not None:
+            self.timer.wall += perf_counter() - wall_start
+            self.timer.display()
+
+    def run(self, end_time):
+        """Process events until the end of the last loop (time end_time)."""
+        events = self.events
+        feed = self.exchange.feed
+        while events and events[0][0] <= end_time:
+            time, kind, _, payload = heapq.heappop(events)
+            if time == end_time and kind != self.RECORD:
+                heapq.heappush(events, (time, kind, _, payload))  # belongs to the next play_game call
+                break
+            self.now = time
+            loop_num = int(time)
+            if feed is not None:
+                feed.loop = loop_num
+
+            if kind == self.WAKE:
+                self.wake(payload, loop_num)
+            elif kind == self.ARRIVE:
+                bot_name, messages = payload
+                self.arrive(bot_name, messages, loop_num)
+            elif kind == self.DELIVER:
+                bot_name, trades = payload
+                self.deliver_trades(bot_name, trades)
+            else:
+                if self.feed_cursors:
+                    feed.trim(min(self.feed_cursors.values()))
+                self.record_state(payload)
+                self.loop = payload + 1
+                if time < end_time:
+                    self.push(time + 1, self.RECORD, payload + 1)
+
+    def wake(self, bot_name, loop_num):
+        bot = self.bots[bot_name]
+        messages = self.collect_messages(bot_name, bot, loop_num)
+        arrival = self.now + self.decision_latency[bot_name] + self.delay(bot_name)
+        if messages:
+            if arrival == self.now:
+                self.arrive(bot_name, messages, loop_num)
+            else:
+                self.push(arrival, self.ARRIVE, (bot_name, messages))
+        self.push(self.now + self.interval, self.WAKE, bot_name)
+
+    def arrive(self, bot_name, messages, loop_num):
+        n = len(self.trade_log)
+        trades = self.process_messages(bot_name, self.bots[bot_name], messages, loop_num)
+        if not trades:
+            return
+        self.trade_times.extend([self.now] * (len(self.trade_log) - n))
+        if self.instant_reports:
+            self.distribute_trades(trades)
+            return
+        # each bot hears about the trades it is entitled to after its own network delay
+        parties = {trade.agg_bot for trade in trades} | {trade.rest_bot for trade in trades}
+        for name in self.bots:
+            if name in self.player_bots or name in self.public_subscribers or name in parties:
+                delay = self.delay(name)
+                if delay:
+                    self.push(self.now + delay, self.DELIVER, (name, trades))
+                else:
+                    self.deliver_trades(name, trades)
+
+    def deliver_trades(self, bot_name, trades):
+        """distribute_trades for a single bot."""
+        bot = self.bots[bot_name]
+        if bot_name in self.player_bots:
+            bot.process_trades(self.anonymise_trades(trades, bot_name))
+        elif bot_name in self.public_subscribers:
+            self.realisation = bot.process_trades(trades, self.realisation)
+        else:
+            own = [trade for trade in trades if trade.agg_bot == bot_name or trade.rest_bot == bot_name]
+            if own:
+                self.realisation = bot.process_trades(own, self.realisation)
@@ -0,0 +1,167 @@
+import math
+from typing import Dict, List
+
+import numpy as np
+
+
+BASKET = "BASKET"  # stands in for an ETF's component basket in a ConversionRequest
+
+
+class ConversionPath:
+    """
+    A resolved conversion from one product to another. One unit of `start` becomes
+    `ratio` units of `end` and costs `fee` in cash, over the tickers in `legs`.
+    """
+    __slots__ = ("start", "end", "ratio", "fee", "legs")
+
+    def __init__(self, start: str, end: str, ratio: float, fee: float, legs: List[str]):
+        self.start = start
+        self.end = end
+        self.ratio = ratio
+        self.fee = fee
+        self.legs = legs
+
+    def __str__(self):
+        return f'{" -> ".join(self.legs)}: 1 {self.start} = {self.ratio} {self.end}, fee {self.fee}'
+
+
+class ConversionGraph:
+    """
+    All conversions between a set of products, resolved once up front.
+
+    Product.conversions gives the direct conversions: {target: ratio} or
+    {target: (ratio, fee)}, where one unit converts into `ratio` units of target for
+    `fee` cash. A Product with a `basket` ({component: units}) is an ETF that can be
+    created from, or redeemed into, its basket for `basket_fee` cash per unit.
+
+    Best paths between every pair of tickers are found with a vectorised
+    Floyd-Warshall over the ratio matrix: most units out, then lowest fee. Every
+    request after that is a table lookup. Cycles that end up with more than they
+    started (ratio product > 1) are arbitrage and rejected.
+    """
+    TOL = 1e-9
+
+    def __init__(self, products: List):
+        self.tickers = [p.ticker for p in products]
+        self.idx = {t: i for i, t in enumerate(self.tickers)}
+        n = len(self.tickers)
+
+        ratio = np.zeros((n, n))
+        fee = np.zeros((n, n))
+        legs = np.zeros((n, n), dtype=np.int64)
+        nxt = np.full((n, n), -1, dtype=np.int64)
+        np.fill_diagonal(ratio, 1.0)
+        np.fill_diagonal(nxt, np.arange(n))
+        for product in products:
+            i = self.idx[product.ticker]
+            for target, conversion in product.conversions.items():
+                if target not in self.idx:
+                    raise ValueError(f"{product.ticker} converts into unknown product {target}")
+                r, f = conversion if isinstance(conversion, (tuple, list)) else (conversion, 0.0)
+                if r <= 0:
+                    raise ValueError(f"Conversion ratio {product.ticker} -> {target} must be positive")
+                j = self.idx[target]
+                ratio[i, j], fee[i, j], legs[i, j], nxt[i, j] = r, f, 1, j
+
+        for k in range(n):
+            # going i -> k -> j: ratios multiply, and the k -> j fee is paid on ratio[i, k] units
+            cand_ratio = ratio[:, k, None] * ratio[None, k, :]
+            cand_fee = fee[:, k, None] + ratio[:, k, None] * fee[None, k, :]
+            better = (cand_ratio > ratio * (1 + self.TOL)) | (
+                np.isclose(cand_ratio, ratio, rtol=self.TOL, atol=0) & (cand_ratio > 0) & (cand_fee < fee - self.TOL))
+            np.fill_diagonal(better, False)
+            if better.any():
+                ratio = np.where(better, cand_ratio, ratio)
+                fee = np.where(better, cand_fee, fee)
+                legs = np.where(better, legs[:, k, None] + legs[None, k, :], legs)
+                nxt = np.where(better, nxt[:, k, None], nxt)
+        round_trips = ratio * ratio.T  # i -> j -> i
+        if (round_trips > 1 + 1e-6).any():
+            i, j = np.argwhere(round_trips > 1 + 1e-6)[0]
+            raise ValueError(f"Conversions between {self.tickers[i]} and {self.tickers[j]} allow arbitrage")
+        self.ratio, self.fee, self.legs, self.nxt = ratio, fee, legs, nxt
+        self.paths = {}
+
+        # ========== ETF Baskets =========
+        self.baskets = {}  # etf ticker → component units per ETF unit, over self.tickers
+        self.basket_fees = {}
+        for product in products:
+            basket = getattr(product, "basket", None)
+            if not basket:
+                continue
+            units = np.zeros(n)
+            for component, amount in basket.items():
+                if component not in self.idx or component == product.ticker:
+                    raise ValueError(f"Bad basket component {component} for {product.ticker}")
+                units[self.idx[component]] = amount
+            self.baskets[product.ticker] = units
+            self.basket_fees[product.ticker] = product.basket_fee
+
+        # creation_cost[etf][s]: units of s that, converted along the best paths, buy one ETF's basket
+        self.creation_costs = {}
+        self.creation_fees = {}
+        for etf, units in self.baskets.items():
+            comps = np.flatnonzero(units)
+            with np.errstate(divide="ignore"):
+                per_source = units[comps] / ratio[:, comps]  # inf where a component can't be reached
+            self.creation_costs[etf] = per_source.sum(axis=1)
+            reachable = np.isfinite(per_source)
+            fees = np.where(reachable, np.where(reachable, per_source, 0) * fee[:, comps], np.inf)
+            self.creation_fees[etf] = fees.sum(axis=1) + self.basket_fees[etf]
+
+    def path(self, start: str, end: str) -> ConversionPath:
+        """Best path from start to end, or None if there isn't one."""
+        key = (start, end)
+        if key in self.paths:
+            return self.paths[key]
+        i, j = self.idx[start], self.idx[end]
+        path = None
+        if i != j and self.ratio[i, j] > 0:
+            hops = [start]
+            at = i
+            while at != j:
+                at = self.nxt[at, j]
+                hops.append(self.tickers[at])
+            path = ConversionPath(start, end, float(self.ratio[i, j]), float(self.fee[i, j]), hops)
+        self.paths[key] = path
+        return path
+
+    def creation_cost(self, etf: str, source: str):
+        """(units of source, cash fee) to create one unit of etf by converting source into its basket."""
+        s = self.idx[source]
+        return float(self.creation_costs[etf][s]), float(self.creation_fees[etf][s])
+
+    def deltas(self, start: str, end: str, quantity: int) -> Dict[str, float]:
+        """
+        Position changes, including Cash, for converting `quantity` units of start into end.
+        For ETF creation pass start=BASKET and for redemption end=BASKET; quantity is then
+        the number of ETF units.
+        """
+        if start == BASKET or end == BASKET:
+            etf = end if start == BASKET else start
+            if etf not in self.baskets:
+                raise ValueError(f"{etf} has no basket to create or redeem")
+            sign = 1 if start == BASKET else -1  # creation consumes the basket, redemption returns it
+            deltas = {self.tickers[c]: -sign * quantity * float(units) for c, units in enumerate(self.baskets[etf]) if units}
+            deltas[etf] = sign * quantity
+            deltas["Cash"] = -quantity * self.basket_fees[etf]
+            return deltas
+
+        path = self.path(start, end)
+        if path is None:
+            raise ValueError(f"No conversion path from {start} to {end}")
+        return {start: -quantity, end: quantity * path.ratio, "Cash": -quantity * path.fee}
+
+    @staticmethod
+    def integral(deltas: Dict[str, float]) -> Dict[str, float]:
+        """Round product deltas to whole units, or raise if a conversion would leave a fraction."""
+        out = {}
+        for ticker, delta in deltas.items():
+            if ticker == "Cash":
+                out[ticker] = delta
+                continue
+            units = round(delta)
+            if not math.isclose(delta, units, abs_tol=1e-6):
+                raise ValueError(f"Conversion would leave a fractional position in {ticker} ({delta})")
+            out[ticker] = units
+        return out
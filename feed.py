@@ -0,0 +1,67 @@
+from typing import List
+
+import pandas as pd
+
+
+class MarketEvent:
+    """
+    One change to the book. side is the side of the book that changed ("Bids"/"Asks")
+    and size is the amount added (ADD) or removed (CANCEL, FILL) at price.
+    Events are anonymous: no bot names or order ids.
+    """
+    __slots__ = ("seq", "loop", "kind", "ticker", "side", "price", "size")
+
+    def __init__(self, seq: int, loop: int, kind: str, ticker: str, side: str, price: float, size: int):
+        self.seq = seq
+        self.loop = loop
+        self.kind = kind
+        self.ticker = ticker
+        self.side = side
+        self.price = price
+        self.size = size
+
+    def __str__(self):
+        return f'#{self.seq} {self.kind} {self.size} {self.ticker} {self.side} at {self.price}'
+
+
+class MarketFeed:
+    """
+    Sequenced stream of book deltas published by the Exchange.
+
+    Consumers remember the next sequence number they want and call since(seq). Events
+    everyone has seen are dropped by trim() unless keep_history is set, in which case
+    the feed doubles as a replayable market-data log.
+    """
+    def __init__(self, keep_history: bool = False):
+        self.keep_history = keep_history
+        self.events = []
+        self.start_seq = 0  # seq of self.events[0]
+        self.seq = 0  # seq the next event will get
+        self.loop = 0  # set by the game at the start of every loop
+
+    def publish(self, kind: str, ticker: str, side: str, price: float, size: int):
+        self.events.append(MarketEvent(self.seq, self.loop, kind, ticker, side, price, size))
+        self.seq += 1
+
+    def since(self, seq: int) -> List[MarketEvent]:
+        if seq < self.start_seq:
+            raise ValueError(f"Events before #{self.start_seq} have been trimmed")
+        return self.events[seq - self.start_seq:]
+
+    def trim(self, seq: int):
+        """Forget events before seq."""
+        if self.keep_history or seq <= self.start_seq:
+            return
+        del self.events[:seq - self.start_seq]
+        self.start_seq = seq
+
+    def to_pandas(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "seq": [e.seq for e in self.events],
+            "loop": [e.loop for e in self.events],
+            "kind": [e.kind for e in self.events],
+            "ticker": [e.ticker for e in self.events],
+            "side": [e.side for e in self.events],
+            "price": [e.price for e in self.events],
+            "size": [e.size for e in self.events],
+        })
@@ -1,17 +1,27 @@
 # pyright: ignore[reportMissingImports]
 import matplotlib.pyplot as plt
-import math
 import numpy as np
 import pandas as pd
 
 from base import Exchange, Trade, Order, Product, Rest
 from bots import RandomTrader, MarketMaker, Taker, Reverter
+from rng import RandomStream
+from recorder import GameRecorder, RecordWriter
+from profiler import PhaseTimer
+from conversions import BASKET, ConversionGraph
+from scheduler import Scheduler
 
+import numbers
 import random
-from time import time
+from time import perf_counter, time
 
 
 class ConversionRequest:
+    """
+    Convert quantity units of start_ticker into end_ticker, along the best conversion
+    path. Use BASKET as start_ticker to create an ETF from its components or as
+    end_ticker to redeem one; quantity is then in ETF units.
+    """
     def __init__(self, start_ticker, end_ticker, quantity):
         self.start_ticker = start_ticker
         self.end_ticker = end_ticker
@@ -19,12 +29,20 @@ class ConversionRequest:
 
 
 class Convert:
-    def __init__(self):
-        pass
+    """A completed conversion: the position changes (including Cash) applied to bot_name."""
+    def __init__(self, bot_name, request, deltas, loop_num):
+        self.bot_name = bot_name
+        self.request = request
+        self.deltas = deltas
+        self.loop_num = loop_num
+
+    def __str__(self):
+        return f'{self.bot_name} converted {self.request.quantity} {self.request.start_ticker} into {self.request.end_ticker}: {self.deltas}'
 
 
 class Game:
-    def __init__(self, products, bots, exempt_bots=[], player_bots = [], pos_limit_type="SOFT", sentiments=None):
+    def __init__(self, products, bots, exempt_bots=[], player_bots = [], pos_limit_type="SOFT", sentiments=None, record_feed=False, seed=None, draw_block=1024,
+                 record_every=1, record_columns=None, record_path=None, record_chunk=10000, profile=False, schedule=False, record_flow=None):
         self.pos_limit_type = pos_limit_type
         self.exchange = Exchange(products)
         self.bots = {bot.name: bot for bot in bots}
@@ -33,6 +51,12 @@ class Game:
         self.ticker_to_product = {p.ticker: p for p in self.products}
         self.exempt_bots = exempt_bots
         self.player_bots = player_bots
+        self.public_subscribers = {bot.name for bot in bots if getattr(bot, "public_prints", False)}
+
+        # ========== Per-Bot Random Streams =========
+        # each bot draws from its own stream derived from the game seed, so a seeded game is reproducible
+        self.draw_block = draw_block
+        self.reseed(seed if seed is not None else np.random.SeedSequence().entropy)
         self.whale_trades = []
         for bot in self.positions:
             self.positions[bot]['Cash'] = 0
@@ -50,26 +74,83 @@ class Game:
 
         self.realisation = {product.ticker: 0 for product in products}
 
-        self.trade_log = []
+        self.trade_log = self.exchange.trade_log  # columnar, filled by the exchange as trades happen
+
+        # ========== Conversions =========
+        # every path between products is resolved here, so a request is a table lookup
+        self.conversions = ConversionGraph(products)
+        self.conversion_log = []
+
+        # ========== Rejections =========
+        # messages turned away for breaching position limits; the game carries on without them
+        self.rejections = {name: 0 for name in self.bots}
+
+        # ========== Market Data Feed =========
+        # bots with a process_events method get the book deltas since their last turn
+        self.feed_cursors = {name: 0 for name, bot in self.bots.items() if hasattr(bot, "process_events")}
+        if self.feed_cursors or record_feed:
+            self.exchange.enable_feed(keep_history=record_feed)
 
         # ========== Mids and Sentiments Tracking =========
-        self.record = {}
-        for product in products:
-            self.record[product.ticker] = []
+        # same columns, in the same order, as the old dict-of-lists record
+        all_columns = [product.ticker for product in products]
+        position_columns = []
         for bot in self.bots:
             for product in products:
-
-                self.record[f"{bot}_{product.ticker}"] = []
-            self.record[f"{bot}_Cash"] = []
-        self.record["Loop"] = []
+                position_columns.append(f"{bot}_{product.ticker}")
+                all_columns.append(f"{bot}_{product.ticker}")
+            all_columns.append(f"{bot}_Cash")
+        all_columns.append("Loop")
 
         for product in products:
-            self.record[f"Realisation_{product.ticker}"] = []
-            self.record[f"Sentiment_{product.ticker}"] = []
+            all_columns.append(f"Realisation_{product.ticker}")
+            all_columns.append(f"Sentiment_{product.ticker}")
+        self.record = GameRecorder(all_columns, columns=record_columns, every=record_every,
+                                   int_columns=position_columns + ["Loop"])
+        if record_path is not None:
+            # stream the record to disk in chunks of record_chunk rows while the game runs; close() finishes the file
+            self.record.attach(RecordWriter(record_path, self.record.columns, self.record.int_columns), record_chunk)
+
+        # ========== Order-Flow Log =========
+        # record_flow=path logs the market bots' messages so replay.ReplayGame can re-run players against them;
+        # the log stays open across play_game calls until close()
+        self.flow = None
+        if record_flow is not None:
+            from replay import FlowWriter
+            self.flow = FlowWriter(record_flow, list(self.bots), products, self.seed, self.player_bots)
+
+        # ========== Event-Driven Turns =========
+        # with schedule=True only bots whose wake conditions hold get a turn (see scheduler.py)
+        self.scheduler = Scheduler(self) if schedule else None
+
+        # ========== Continuing Play =========
+        # play_game carries on from self.loop, so a game (or a restored snapshot) can be played in stretches
+        self.loop = 0  # next loop to play
+        self.started = False
+
+        # ========== Per-Phase Timing =========
+        # opt in with profile=True: the timed methods are wrapped on these instances only,
+        # so an unprofiled game pays nothing
+        self.timer = None
+        if profile:
+            self.timer = PhaseTimer()
+            for bot_name, bot in self.bots.items():
+                self.timer.instrument(bot, "send_messages", f"{bot_name}.send_messages")
+                self.timer.instrument(bot, "process_trades", f"{bot_name}.process_trades")
+            for method_name in ("process_order", "update_quotes", "add_order", "remove_order"):
+                self.timer.instrument(self.exchange, method_name)
+            for method_name in ("validate_order", "validate_quote", "distribute_trades", "record_state"):
+                self.timer.instrument(self, method_name)
     
-    def anonymise_trades(self, trades, bot_name):
+    def anonymise_trades(self, trades, bot_name, public_trades=None):
+        """
+        The trades as bot_name may see them. public_trades are the fully anonymised
+        versions of the same trades; pass them in to share one copy between all players.
+        """
+        if public_trades is None:
+            public_trades = [self.public_trade(trade) for trade in trades]
         anonymised_trades = []
-        for trade in trades:
+        for trade, public_trade in zip(trades, public_trades):
             if trade.agg_bot == bot_name:
                 anonymised_trade = Trade(
                     ticker=trade.ticker,
@@ -79,7 +160,8 @@ class Game:
                     agg_dir=trade.agg_dir,
                     rest_order_id="Anonymised",  
                     agg_bot=bot_name,  
-                    rest_bot="Anonymised"  
+                    rest_bot="Anonymised",
+                    trade_time=trade.trade_time
                 )
             elif trade.rest_bot == bot_name:
                 anonymised_trade = Trade(
@@ -90,22 +172,35 @@ class Game:
                     agg_dir=trade.agg_dir,
                     rest_order_id=trade.rest_order_id,
                     agg_bot="Anonymised",  # Anonymise the other bot
-                    rest_bot=bot_name  # Keep the bot name
+                    rest_bot=bot_name,  # Keep the bot name
+                    trade_time=trade.trade_time
                 )
             else:
-                anonymised_trade = Trade(
-                    ticker=trade.ticker,
-                    price=trade.price,
-                    size=trade.size,
-                    agg_order_id="Anonymised",
-                    agg_dir=trade.agg_dir,
-                    rest_order_id="Anonymised",
-                    agg_bot="Anonymised",  # Anonymise both bots
-                    rest_bot="Anonymised"
-                )
+                anonymised_trade = public_trade
             anonymised_trades.append(anonymised_trade)
         return anonymised_trades
+
+    @staticmethod
+    def public_trade(trade):
+        return Trade(
+            ticker=trade.ticker,
+            price=trade.price,
+            size=trade.size,
+            agg_order_id="Anonymised",
+            agg_dir=trade.agg_dir,
+            rest_order_id="Anonymised",
+            agg_bot="Anonymised",  # Anonymise both bots
+            rest_bot="Anonymised",
+            trade_time=trade.trade_time
+        )
   
+    def reseed(self, seed):
+        """Give every bot a fresh random stream derived from seed, e.g. to send forks of one snapshot down different paths."""
+        self.seed = seed
+        for bot in self.bots.values():
+            if hasattr(bot, "set_rng"):
+                bot.set_rng(RandomStream.for_bot(seed, bot.name, self.draw_block))
+
     def initialise_game(self):
         start_idx = 0
         for bot in self.bots.values():
@@ -113,116 +208,313 @@ class Game:
             start_idx += 10e6
         
     def play_game(self, iterations):
-        self.initialise_game()
-        for idx in range(iterations):
-            self.game_loop(idx)
+        """Play `iterations` more loops, carrying on from the last call (or a restored snapshot)."""
+        if not self.started:
+            self.initialise_game()
+            if self.scheduler is not None:
+                self.scheduler.start(self.loop)
+            self.started = True
+        self.record.start(iterations)
+        start = perf_counter()
+        try:
+            for idx in range(self.loop, self.loop + iterations):
+                self.game_loop(idx)
+                self.loop = idx + 1
+        finally:
+            self.flush()
+        if self.timer is not None:
+            self.timer.wall += perf_counter() - start
+            self.timer.display()
+
+    def flush(self):
+        """Push everything recorded so far to the record file and the order-flow log, if the game is writing them."""
+        self.record.flush()
+        if self.flow is not None:
+            self.flow.flush()
+
+    def close(self):
+        """
+        Finish the record file and the order-flow log. Call it once the last play_game is
+        done; a game played on after this keeps its record in memory and logs no flow.
+        """
+        self.record.close()
+        if self.flow is not None:
+            self.flow.close()
+            self.flow = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # `with Game(..., record_path=...) as game:` finishes the files even if the run crashes
+        self.close()
+        return False
 
     def record_state(self, loop_num):
+        if not self.record.wants(loop_num):
+            return
+        book_view = self.exchange.book_view
+        row = []
         for product in self.products:
-            # Append the mid price for the product
-            if self.exchange.book[product.ticker]["Bids"] and self.exchange.book[product.ticker]["Asks"]:
-                mid_price = (self.exchange.book[product.ticker]["Bids"][0].price + self.exchange.book[product.ticker]["Asks"][0].price) / 2
+            mid_price = book_view.mid(product.ticker)
+            row.append(mid_price if mid_price is not None else np.nan)
 
-                self.record[product.ticker].append(mid_price)
-            else:
-                self.record[product.ticker].append(None)
-            self.record[f"Realisation_{product.ticker}"].append(self.realisation[product.ticker])
-            self.record[f"Sentiment_{product.ticker}"].append(self.sentiments[product.ticker])
-        
-        for bot_name, bot in self.bots.items():
+        for bot_name in self.bots:
+            positions = self.positions[bot_name]
             for product in self.products:
-                self.record[f"{bot_name}_{product.ticker}"].append(self.positions[bot_name][product.ticker])
-            self.record[f"{bot_name}_Cash"].append(self.positions[bot_name]['Cash'])
-        
-        self.record["Loop"].append(loop_num)      
+                row.append(positions[product.ticker])
+            row.append(positions['Cash'])
+        row.append(loop_num)
+
+        for product in self.products:
+            row.append(self.realisation[product.ticker])
+            row.append(self.sentiments[product.ticker])
+
+        self.record.append(row)
 
 
     def game_loop(self, loop_num):
-        
-        for bot_name, bot in self.bots.items():
+        feed = self.exchange.feed
+        if feed is not None:
+            feed.loop = loop_num
 
-            # ===== Get Messages from Bot =====
-            if bot_name in self.player_bots:
-                messages = bot.send_messages(self.exchange.book)
-            else:
-                messages, self.sentiments, self.realisation = bot.send_messages(self.exchange.book, self.sentiments, self.realisation, loop_num)
-
-            for msg in messages:
-                trades = []
-                if msg.msg_type == "ORDER":
-                    order = msg.message
-                    if self.validate_order(order):
-                        # ===== Get Trades so that the bots can then process them =====
-                        trades += self.exchange.process_order(loop_num, order)
-
-                        for other_bot in self.bots.values():
-                            if other_bot.name in self.player_bots:
-                                # Anonymise trades for player bots
-                                anonymised_trades = self.anonymise_trades(trades, other_bot.name)
-                                other_bot.process_trades(anonymised_trades)
-                            else:
-                                self.realisation = other_bot.process_trades(trades, self.realisation)
-
-                        self.track_positions(trades)
-
-                if msg.msg_type == "CONVERSION":
-                    convert = msg.message
-                    if self.validate_conversion(convert):
-                        converts = self.perform_conversion(convert)
-                        if hasattr(bot, "process_conversions"):
-                            bot.process_conversions(converts)
-
-                if msg.msg_type == "REMOVE":
-                    order_id = msg.message
-                    self.exchange.remove_order(order_id)
+        turns = self.bots.items() if self.scheduler is None else self.scheduler.turns(loop_num)
+        for bot_name, bot in turns:
+            messages = self.collect_messages(bot_name, bot, loop_num)
+            turn_trades = self.process_messages(bot_name, bot, messages, loop_num)
 
-        self.record_state(loop_num)
+            # ===== Hand the Turn's Trades to the Bots in One Batch =====
+            if turn_trades:
+                self.distribute_trades(turn_trades)
 
+        if self.feed_cursors:
+            feed.trim(min(self.feed_cursors.values()))
 
-    def validate_conversion(self, convert):
-        return True  # stub for now
+        if self.flow is not None:
+            self.flow.write_loop_end(loop_num, self.sentiments, self.realisation)
+        self.record_state(loop_num)
+
+    def collect_messages(self, bot_name, bot, loop_num):
+        """Give the bot its turn to look at the market and return the messages it sends."""
+        # ===== Deliver Book Deltas Since the Bot's Last Turn =====
+        if bot_name in self.feed_cursors:
+            feed = self.exchange.feed
+            bot.process_events(feed.since(self.feed_cursors[bot_name]))
+            self.feed_cursors[bot_name] = feed.seq
+
+        # ===== Get Messages from Bot =====
+        if bot_name in self.player_bots:
+            return bot.send_messages(self.exchange.book_view)
+        messages, self.sentiments, self.realisation = bot.send_messages(self.exchange.book_view, self.sentiments, self.realisation, loop_num)
+        return messages
+
+    def process_messages(self, bot_name, bot, messages, loop_num):
+        """
+        Act on a bot's messages in order; returns the trades they caused. With a flow log
+        open, a market bot's messages are logged once they have passed validation (and
+        before the exchange changes the orders), so a replay only sees what was acted on.
+        """
+        turn_trades = []
+        flow = self.flow if bot_name not in self.player_bots else None
+        for msg in messages:
+            trades = []
+            if msg.msg_type == "ORDER":
+                order = msg.message
+                if self.validate_order(order, sender=bot_name):
+                    if flow is not None:
+                        flow.write_message(loop_num, bot_name, msg)
+                    # ===== Get Trades so that the bots can then process them =====
+                    trades += self.exchange.process_order(loop_num, order)
+                    self.track_positions(trades)
+                    turn_trades += trades
+
+            if msg.msg_type == "QUOTE_UPDATE":
+                quote = msg.message
+                if self.validate_quote(quote, sender=bot_name):
+                    if flow is not None:
+                        flow.write_message(loop_num, bot_name, msg)
+                    trades += self.exchange.update_quotes(loop_num, quote)
+                    self.track_positions(trades)
+                    turn_trades += trades
+
+            if msg.msg_type == "CONVERSION":
+                convert = msg.message
+                if self.validate_conversion(bot_name, convert):
+                    if flow is not None:
+                        flow.write_message(loop_num, bot_name, msg)
+                    converts = self.perform_conversion(bot_name, convert, loop_num)
+                    if hasattr(bot, "process_conversions"):
+                        bot.process_conversions(converts)
+
+            if msg.msg_type == "REMOVE":
+                order_id = msg.message
+                if flow is not None:
+                    flow.write_message(loop_num, bot_name, msg)
+                self.exchange.remove_order(order_id)
+        return turn_trades
+
+
+    def distribute_trades(self, trades):
+        """
+        Market bots get the trades they were a party to (or all of them if they set
+        public_prints = True). Player bots get every trade, anonymised; the fully
+        anonymised copies are built once and shared between them.
+        """
+        party_trades = {}
+        for trade in trades:
+            party_trades.setdefault(trade.agg_bot, []).append(trade)
+            if trade.rest_bot != trade.agg_bot:
+                party_trades.setdefault(trade.rest_bot, []).append(trade)
+        if self.scheduler is not None:
+            for bot_name in party_trades:
+                self.scheduler.wake(bot_name)
+
+        public_trades = None
+        for bot_name, bot in self.bots.items():
+            if bot_name in self.player_bots:
+                if public_trades is None:
+                    public_trades = [self.public_trade(trade) for trade in trades]
+                bot.process_trades(self.anonymise_trades(trades, bot_name, public_trades))
+            elif bot_name in self.public_subscribers:
+                self.realisation = bot.process_trades(trades, self.realisation)
+            elif bot_name in party_trades:
+                self.realisation = bot.process_trades(party_trades[bot_name], self.realisation)
+
+    def validate_conversion(self, bot_name, convert):
+        """
+        The bot must hold everything the conversion uses up, end up with whole units, and
+        stay within its position limits, and the quantity must be a positive whole number
+        (NumPy integers included); otherwise the request is rejected (see reject).
+        """
+        if not isinstance(convert.quantity, numbers.Integral) or convert.quantity <= 0:
+            return self.reject(bot_name, convert, f"Conversion quantity must be a positive int, got {convert.quantity}")
+        for ticker in (convert.start_ticker, convert.end_ticker):
+            if ticker != BASKET and ticker not in self.ticker_to_product:
+                return self.reject(bot_name, convert, f"Unknown product {ticker} in conversion")
+        try:
+            deltas = self.conversions.integral(
+                self.conversions.deltas(convert.start_ticker, convert.end_ticker, convert.quantity))
+        except ValueError as e:  # no path, no basket, or a fractional result
+            return self.reject(bot_name, convert, str(e))
+        positions = self.positions[bot_name]
+        for ticker, delta in deltas.items():
+            if ticker == "Cash":
+                continue
+            if delta < 0 and positions[ticker] + delta < 0:
+                return self.reject(bot_name, convert, f"{bot_name} holds {positions[ticker]} {ticker}, needs {-delta} to convert")
+            if delta > 0 and not self.check_limits(bot_name, ticker, delta, 0):
+                return self.reject(bot_name, convert, f"Conversion into {ticker} exceeds {self.pos_limit_type.lower()} limit")
+        return True
 
-    def validate_order(self, order):
+    def validate_order(self, order, check_limits=True, sender=None):
+        if sender is not None and order.bot_name != sender:
+            return self.reject(sender, order, f"Order {order.order_id} is {order.bot_name}'s, sent by {sender}")
         product = self.ticker_to_product[order.ticker]
-        ratio = order.price / product.mpv
-        if not math.isclose(ratio, round(ratio), abs_tol=1e-6):
+        # convert to ticks once; the exchange matches and books the order on order.tick
+        tick = product.to_tick(order.price)
+        if tick is None:
             raise ValueError(f"Order {order.order_id} violates MPV for {order.ticker} ({order.price} not a multiple of {product.mpv})")
-        if product.max_price is not None and order.price > product.max_price:
+        if tick > product.max_tick:
             raise ValueError(f"Order {order.order_id} price exceeds max for {order.ticker}")
-        if product.min_price is not None and order.price < product.min_price:
+        if tick < product.min_tick:
             raise ValueError(f"Order {order.order_id} price below min for {order.ticker}")
+        order.tick = tick
 
-        if self.pos_limit_type == "SOFT":
-            if not self.soft_limit(order):
-                raise ValueError(f"Order {order.order_id} exceeds soft limit")
-        elif self.pos_limit_type == "HARD":
-            if not self.hard_limit(order):
-                raise ValueError(f"Order {order.order_id} exceeds hard limit")
+        if check_limits:
+            buys, sells = (order.size, 0) if order.agg_dir == "Buy" else (0, order.size)
+            if not self.check_limits(order.bot_name, order.ticker, buys, sells):
+                return self.reject(order.bot_name, order, f"Order {order.order_id} exceeds {self.pos_limit_type.lower()} limit")
+
+        return True
 
+    def validate_quote(self, quote, sender=None):
+        """A bot can only replace its own ladder; sender is the bot that sent the quote."""
+        sender = quote.bot_name if sender is None else sender
+        if quote.bot_name != sender:
+            return self.reject(sender, quote, f"{quote.bot_name}'s {quote.ticker} quote sent by {sender}")
+        buys = sells = 0
+        for order in quote.orders:
+            if order.ticker != quote.ticker:
+                raise ValueError(f"Order {order.order_id} does not belong to {quote.bot_name}'s {quote.ticker} quote")
+            if order.bot_name != sender:
+                return self.reject(sender, quote, f"Order {order.order_id} in {sender}'s {quote.ticker} quote is {order.bot_name}'s")
+            self.validate_order(order, check_limits=False)
+            if order.agg_dir == "Buy":
+                buys += order.size
+            else:
+                sells += order.size
+        # the new ladder replaces the old one, so only the difference counts towards the limit
+        replacing = self.exchange.quote_volume(quote.bot_name, quote.ticker)
+        if not self.check_limits(quote.bot_name, quote.ticker, buys, sells, replacing):
+            # the old ladder keeps resting
+            return self.reject(quote.bot_name, quote, f"{quote.bot_name}'s {quote.ticker} quote exceeds {self.pos_limit_type.lower()} limit")
         return True
 
-    def soft_limit(self, order):
+    def check_limits(self, bot_name, ticker, buys, sells, replacing=(0, 0)):
+        """Whether buys / sells more resting keep the bot within pos_limit, under pos_limit_type."""
+        if self.pos_limit_type == "SOFT":
+            return self.soft_limit(bot_name, ticker, buys, sells, replacing)
+        if self.pos_limit_type == "HARD":
+            return self.hard_limit(bot_name, ticker, buys, sells, replacing)
         return True
+
+    def reject(self, bot_name, message, reason):
         """
-        product = self.ticker_to_product[order.ticker]
-        pos_lim = product.pos_limit
-        if pos_lim is None or order.bot_name in self.exempt_bots:
-            return True
-        real_size = self.mapping[order.agg_dir] * order.size
-        current_pos = self.positions[order.bot_name][order.ticker]
-        new_pos = current_pos + real_size
-        return -pos_lim <= new_pos <= pos_lim
+        Turn a message away and let the game carry on. The rejection is counted in
+        self.rejections, and the bot is told if it has a process_rejection(message, reason)
+        method. Returns False, for the validate_* methods to hand back.
+        """
+        self.rejections[bot_name] = self.rejections.get(bot_name, 0) + 1
+        bot = self.bots.get(bot_name)
+        if hasattr(bot, "process_rejection"):
+            bot.process_rejection(message, reason)
+        return False
 
+    def exposure(self, bot_name, ticker, buys=0, sells=0, replacing=(0, 0)):
+        """
+        (position, resting buys, resting sells) for a bot, as they would be with buys / sells
+        more resting and the `replacing` (buys, sells) taken away. The resting sizes are kept
+        by the exchange as orders are added, filled and cancelled, so this is O(1).
         """
+        open_buys, open_sells = self.exchange.open_orders.get((bot_name, ticker), (0, 0))
+        return (self.positions[bot_name][ticker],
+                open_buys + buys - replacing[0],
+                open_sells + sells - replacing[1])
+
+    def net_exposure(self, bot_name, ticker):
+        position, open_buys, open_sells = self.exposure(bot_name, ticker)
+        return position + open_buys - open_sells
+
+    def gross_exposure(self, bot_name, ticker):
+        position, open_buys, open_sells = self.exposure(bot_name, ticker)
+        return abs(position) + open_buys + open_sells
+
+    def soft_limit(self, bot_name, ticker, buys, sells, replacing=(0, 0)):
+        """Net exposure (position plus resting buys minus resting sells) stays within pos_limit."""
+        pos_lim = self.ticker_to_product[ticker].pos_limit
+        if pos_lim is None or bot_name in self.exempt_bots:
+            return True
+        position, open_buys, open_sells = self.exposure(bot_name, ticker, buys, sells, replacing)
+        return -pos_lim <= position + open_buys - open_sells <= pos_lim
 
-    def hard_limit(self, order):
-        return False  # implement as neededs
+    def hard_limit(self, bot_name, ticker, buys, sells, replacing=(0, 0)):
+        """The position stays within pos_limit even if every resting order on one side fills."""
+        pos_lim = self.ticker_to_product[ticker].pos_limit
+        if pos_lim is None or bot_name in self.exempt_bots:
+            return True
+        position, open_buys, open_sells = self.exposure(bot_name, ticker, buys, sells, replacing)
+        return position + open_buys <= pos_lim and position - open_sells >= -pos_lim
     
-    def record_trades(self, trades, iteration):
-        for trade in trades:
-            self.trade_log.append((iteration, trade))
-        
-
+    def perform_conversion(self, bot_name, convert, loop_num=None):
+        """Apply a validated conversion to the bot's positions in one step, and log it."""
+        deltas = self.conversions.integral(
+            self.conversions.deltas(convert.start_ticker, convert.end_ticker, convert.quantity))
+        positions = self.positions[bot_name]
+        for ticker, delta in deltas.items():
+            positions[ticker] += delta
+        result = Convert(bot_name, convert, deltas, loop_num)
+        self.conversion_log.append(result)
+        return result
 
     def track_positions(self, trades):
         for trade in trades:
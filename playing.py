@@ -45,6 +45,7 @@ bots = [player_bot] + list(market_bots.values())
 """
 This trading game is turn based -> there is no latency effect 
 i just iterate through all the different bots 
+(continuous.ContinuousGame plays the same bots in continuous time with per-bot latencies)
 """
 
 
@@ -0,0 +1,67 @@
+from functools import wraps
+from time import perf_counter
+
+from rich.console import Console
+from rich.table import Table
+
+
+class PhaseTimer:
+    """
+    Accumulates wall time and call counts per named phase.
+
+    Phases are timed by replacing a method on one object with a timing wrapper
+    (instrument), so nothing is added to the hot path of objects that aren't
+    instrumented and a game without a timer runs exactly as before.
+
+    Times are inclusive: a phase that calls another instrumented method (e.g.
+    process_order calling add_order) includes the inner call's time as well.
+    """
+    def __init__(self):
+        self.totals = {}  # phase → total seconds
+        self.calls = {}  # phase → call count
+        self.wall = 0.0  # time covered by the run being profiled, set by the caller
+
+    def instrument(self, obj, method_name: str, phase: str = None):
+        """Time every call of obj.method_name under `phase` (default "<Type>.<method>")."""
+        phase = phase or f"{type(obj).__name__}.{method_name}"
+        method = getattr(obj, method_name)
+        totals, calls = self.totals, self.calls
+        totals.setdefault(phase, 0.0)
+        calls.setdefault(phase, 0)
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                totals[phase] += perf_counter() - start
+                calls[phase] += 1
+
+        setattr(obj, method_name, timed)
+
+    def reset(self):
+        for phase in self.totals:
+            self.totals[phase] = 0.0
+            self.calls[phase] = 0
+        self.wall = 0.0
+
+    def summary(self) -> list:
+        """(phase, calls, total seconds, mean microseconds, share of wall time) rows, slowest first."""
+        rows = []
+        for phase, total in sorted(self.totals.items(), key=lambda item: -item[1]):
+            calls = self.calls[phase]
+            rows.append((phase, calls, total, 1e6 * total / calls if calls else 0.0,
+                         total / self.wall if self.wall else 0.0))
+        return rows
+
+    def display(self, title: str = "Game timing"):
+        table = Table(title=f"{title} ({self.wall:.3f}s)")
+        table.add_column("Phase", justify="left")
+        table.add_column("Calls", justify="right")
+        table.add_column("Total (s)", justify="right")
+        table.add_column("Mean (µs)", justify="right")
+        table.add_column("% of run", justify="right")
+        for phase, calls, total, mean, share in self.summary():
+            table.add_row(phase, str(calls), f"{total:.4f}", f"{mean:.1f}", f"{100 * share:.1f}")
+        Console().print(table)
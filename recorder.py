@@ -0,0 +1,320 @@
+import json
+import os
+from collections.abc import Mapping
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+class GameRecorder(Mapping):
+    """
+    Per-loop game record in one preallocated 2-D float array (rows x columns), with
+    NaN where there is no value (e.g. no mid when a side of the book is empty).
+
+    every=N keeps only every Nth loop and columns= keeps a subset of the columns, to
+    cut memory on long runs. recorder[column] is a view of that column's recorded rows,
+    and to_frame() is a DataFrame over the whole array.
+
+    With a RecordWriter attached, rows are flushed to disk every `chunk_rows` loops (and
+    whenever flush() is called) and only the rows not yet flushed are kept in memory.
+    close() finishes the file.
+    """
+    def __init__(self, all_columns: List[str], columns: List[str] = None, every: int = 1,
+                 int_columns: List[str] = ()):
+        self.all_columns = list(all_columns)
+        self.columns = list(columns) if columns is not None else list(all_columns)
+        unknown = set(self.columns) - set(self.all_columns)
+        if unknown:
+            raise ValueError(f"Unknown record columns: {sorted(unknown)}")
+        self.col_idx = None if self.columns == self.all_columns else np.array([self.all_columns.index(c) for c in self.columns])
+        self.col_pos = {c: i for i, c in enumerate(self.columns)}
+        self.int_columns = [c for c in int_columns if c in self.col_pos]
+        self.every = every
+        self.data = np.full((0, len(self.columns)), np.nan)
+        self.n = 0
+        self.writer = None
+        self.chunk_rows = None
+        self.path = None  # record file the rows have been streamed to, if any
+
+    def attach(self, writer, chunk_rows: int = 10000):
+        self.writer = writer
+        self.chunk_rows = chunk_rows
+        self.path = writer.path
+
+    def start(self, iterations: int):
+        """Make room for `iterations` more loops up front."""
+        rows = -(-iterations // self.every)
+        if self.writer is not None:
+            rows = min(rows, self.chunk_rows)
+        self.reserve(self.n + rows)
+
+    def reserve(self, rows: int):
+        if rows <= len(self.data):
+            return
+        data = np.full((rows, len(self.columns)), np.nan)
+        data[:self.n] = self.data[:self.n]
+        self.data = data
+
+    def wants(self, loop_num: int) -> bool:
+        return loop_num % self.every == 0
+
+    def append(self, row: List[float]):
+        """Store one loop's values, given for all_columns in order."""
+        if self.writer is not None and self.n == self.chunk_rows:
+            self.flush()
+        if self.n == len(self.data):
+            self.reserve(max(2 * self.n, 1024))
+        if self.col_idx is None:
+            self.data[self.n] = row
+        else:
+            self.data[self.n] = np.asarray(row, dtype=float)[self.col_idx]
+        self.n += 1
+
+    def flush(self):
+        """Write the buffered rows to the attached writer and start a new chunk."""
+        if self.writer is not None and self.n:
+            self.writer.write(self.data[:self.n])
+            self.data[:self.n] = np.nan
+            self.n = 0
+
+    def close(self):
+        """Flush the last chunk and finish the file. The recorder goes back to keeping rows in memory."""
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            self.writer = None
+
+    def __getstate__(self):
+        # pickle (e.g. a game snapshot) only the recorded rows; reserve() makes room again
+        state = self.__dict__.copy()
+        state["data"] = self.data[:self.n]
+        return state
+
+    def __getitem__(self, column):
+        return self.data[:self.n, self.col_pos[column]]
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def to_numpy(self) -> np.ndarray:
+        return self.data[:self.n]
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame of the recorded rows. Position and loop columns come back as ints, like the old record."""
+        df = pd.DataFrame(self.data[:self.n], columns=self.columns, copy=False)
+        for column in self.int_columns:
+            df[column] = df[column].astype(np.int64)
+        return df
+
+    def full_frame(self) -> pd.DataFrame:
+        """
+        Every recorded row, including the ones already streamed to disk (read back with
+        load_record) ahead of those still in memory. A Parquet / Feather record can only
+        be read back once Game.close() has finished the file.
+        """
+        if self.path is None:
+            return self.to_frame()
+        if self.writer is not None:
+            if self.writer.format in ("parquet", "feather", "arrow"):
+                raise ValueError(f"{self.path} is still being written; call Game.close() before reading the record")
+            self.flush()
+        df = load_record(self.path)
+        if self.n:
+            df = pd.concat([df, self.to_frame()], ignore_index=True)
+        return df
+
+
+class NpyAppender:
+    """
+    A .npy file that grows by appending rows. The header is written at a fixed length
+    and rewritten after every append, so the file is always loadable (and mmap-able)
+    with the rows written so far.
+    """
+    HEADER_LEN = 128
+
+    def __init__(self, path: str, dtype: str, width: int = None):
+        self.dtype = np.dtype(dtype)
+        self.width = width  # None for a 1-D column file
+        self.rows = 0
+        self.file = open(path, "wb")
+        self.write_header()
+
+    def write_header(self):
+        shape = (self.rows,) if self.width is None else (self.rows, self.width)
+        header = repr({"descr": self.dtype.str, "fortran_order": False, "shape": shape}).encode("latin1")
+        pad = self.HEADER_LEN - 10 - len(header) - 1
+        self.file.seek(0)
+        self.file.write(b"\x93NUMPY\x01\x00" + (self.HEADER_LEN - 10).to_bytes(2, "little") + header + b" " * pad + b"\n")
+        self.file.seek(0, os.SEEK_END)
+
+    def append(self, rows: np.ndarray):
+        self.file.write(np.ascontiguousarray(rows, dtype=self.dtype).tobytes())
+        self.rows += len(rows)
+        self.write_header()
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class RecordWriter:
+    """
+    Appends game-record chunks to a file, with the same columns as game_record.csv.
+    The format comes from the extension:
+    - .csv, flushed after every chunk
+    - .parquet, .feather / .arrow (need pyarrow)
+    - .npy, a float64 rows x columns array plus a <path>.json sidecar with the column names
+    - no extension: a directory with one .npy per column (ints as int64) and a
+      columns.json. This is the layout load_record can memory-map column by column.
+
+    CSV, .npy and the column directory are readable after every chunk, so a crashed
+    run leaves every flushed row behind. Parquet and Feather files only get their
+    footer in close() (Game.close(), or leaving a `with Game(...)` block); until then,
+    or if the process dies first, they can't be read.
+    """
+    def __init__(self, path: str, columns: List[str], int_columns: List[str] = ()):
+        self.path = path
+        self.columns = list(columns)
+        self.int_columns = [c for c in int_columns if c in self.columns]
+        self.format = os.path.splitext(path)[1].lower().lstrip(".") or "dir"
+        self.rows = 0
+        meta = {"columns": self.columns, "int_columns": self.int_columns}
+        if self.format == "csv":
+            self.file = open(path, "w", newline="")
+        elif self.format in ("parquet", "feather", "arrow"):
+            try:
+                import pyarrow as pa
+                import pyarrow.ipc
+                import pyarrow.parquet
+            except ImportError as e:
+                raise ImportError(f"Writing .{self.format} game records needs pyarrow") from e
+            self.pa = pa
+            self.schema = pa.schema([(c, pa.int64() if c in self.int_columns else pa.float64()) for c in self.columns])
+            if self.format == "parquet":
+                self.arrow_writer = pa.parquet.ParquetWriter(path, self.schema)
+            else:
+                self.arrow_writer = pa.ipc.new_file(path, self.schema)
+        elif self.format == "npy":
+            self.appender = NpyAppender(path, "<f8", len(self.columns))
+            with open(path + ".json", "w") as f:
+                json.dump(meta, f)
+        elif self.format == "dir":
+            os.makedirs(path, exist_ok=True)
+            self.appenders = [NpyAppender(os.path.join(path, f"{c}.npy"), "<i8" if c in self.int_columns else "<f8")
+                              for c in self.columns]
+            with open(os.path.join(path, "columns.json"), "w") as f:
+                json.dump(meta, f)
+        else:
+            raise ValueError(f"Unknown game record format: {path}")
+
+    def frame(self, rows: np.ndarray) -> pd.DataFrame:
+        df = pd.DataFrame(rows, columns=self.columns)
+        for column in self.int_columns:
+            df[column] = df[column].astype(np.int64)
+        return df
+
+    def write(self, rows: np.ndarray):
+        if self.format == "csv":
+            self.frame(rows).to_csv(self.file, header=self.rows == 0, index=False)
+            self.file.flush()
+        elif self.format in ("parquet", "feather", "arrow"):
+            batch = self.pa.RecordBatch.from_pandas(self.frame(rows), schema=self.schema, preserve_index=False)
+            self.arrow_writer.write_batch(batch)
+        elif self.format == "npy":
+            self.appender.append(rows)
+        else:
+            for i, appender in enumerate(self.appenders):
+                appender.append(rows[:, i])
+        self.rows += len(rows)
+
+    def close(self):
+        if self.format in ("parquet", "feather", "arrow"):
+            self.arrow_writer.close()
+        elif self.format == "npy":
+            self.appender.close()
+        elif self.format == "dir":
+            for appender in self.appenders:
+                appender.close()
+        else:
+            self.file.close()
+
+
+def convert_record(src: str, dst: str, chunk_rows: int = 100000):
+    """Re-write a CSV game record (e.g. game_record.csv) in another format, a chunk at a time."""
+    writer = None
+    for chunk in pd.read_csv(src, chunksize=chunk_rows):
+        if writer is None:
+            int_columns = [c for c in chunk.columns if pd.api.types.is_integer_dtype(chunk[c])]
+            writer = RecordWriter(dst, list(chunk.columns), int_columns)
+        writer.write(chunk.to_numpy(dtype=float))
+    if writer is not None:
+        writer.close()
+
+
+def load_record(path: str, columns: List[str] = None, start_loop: int = None, stop_loop: int = None) -> pd.DataFrame:
+    """
+    Load (part of) a game record written by RecordWriter.
+
+    For the column-directory and .npy formats the files are memory-mapped: only the
+    requested loops are touched (found by bisecting the Loop column, or by row number
+    if it wasn't recorded), and for the directory format only the requested columns.
+    The directory format returns columns that are views straight onto the mapped
+    files, so several processes can share one record through the page cache.
+    CSV / Parquet / Feather records are read normally and then filtered.
+    """
+    fmt = os.path.splitext(path)[1].lower().lstrip(".") or "dir"
+    if fmt in ("csv", "parquet", "feather", "arrow"):
+        filter_loops = start_loop is not None or stop_loop is not None
+        read_columns = columns
+        if columns is not None and filter_loops and "Loop" not in columns:
+            read_columns = list(columns) + ["Loop"]
+        if fmt == "csv":
+            df = pd.read_csv(path, usecols=read_columns)
+        elif fmt == "parquet":
+            df = pd.read_parquet(path, columns=read_columns)
+        else:
+            df = pd.read_feather(path, columns=read_columns)
+        if filter_loops:
+            loops = df["Loop"].to_numpy() if "Loop" in df else np.arange(len(df))
+            keep = np.ones(len(df), dtype=bool)
+            if start_loop is not None:
+                keep &= loops >= start_loop
+            if stop_loop is not None:
+                keep &= loops < stop_loop
+            df = df[keep]
+        return df[list(columns)] if columns is not None else df
+
+    meta_path = os.path.join(path, "columns.json") if fmt == "dir" else path + ".json"
+    with open(meta_path) as f:
+        meta = json.load(f)
+    all_columns = meta["columns"]
+    columns = list(columns) if columns is not None else all_columns
+
+    if fmt == "dir":
+        def column(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+    else:
+        rows = np.load(path, mmap_mode="r")
+
+        def column(name):
+            return rows[:, all_columns.index(name)]
+
+    loops = column("Loop") if "Loop" in all_columns else None
+    n = len(loops) if loops is not None else len(column(all_columns[0]))
+    lo, hi = 0, n
+    if start_loop is not None:
+        lo = int(np.searchsorted(loops, start_loop)) if loops is not None else min(start_loop, n)
+    if stop_loop is not None:
+        hi = int(np.searchsorted(loops, stop_loop)) if loops is not None else min(stop_loop, n)
+
+    if fmt == "dir":
+        return pd.DataFrame({c: column(c)[lo:hi] for c in columns}, copy=False)
+    df = pd.DataFrame(rows[lo:hi, [all_columns.index(c) for c in columns]], columns=columns)
+    for c in meta["int_columns"]:
+        if c in df:
+            df[c] = df[c].astype(np.int64)
+    return df
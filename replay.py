@@ -0,0 +1,241 @@
+"""
+Record the market bots' order flow once, then re-run player algorithms against it.
+
+Game(record_flow=path) writes every message the non-player bots had accepted (orders,
+quote updates, cancels, conversions; rejected ones are left out) plus each loop's
+closing sentiments and realisation to a compact binary log. ReplayGame plays that log
+back into the exchange in the same turn order, with only the player bots running
+live, so no market bot logic or random draws are re-run.
+
+The replayed flow doesn't react to the player: market bots send exactly what they
+sent in the recorded game. With the same player the replay is the recorded game.
+A live player can have a different name from the recorded one; it takes the recorded
+player's place in the turn order.
+"""
+import json
+import struct
+
+from base import Order, QuoteUpdate
+from bots import Msg
+from conversions import BASKET
+from game import ConversionRequest, Game
+
+
+MAGIC = b"MXFL"
+VERSION = 1
+
+# record kinds
+ORDER, QUOTE, REMOVE, CONVERSION, END_LOOP = range(5)
+
+HEAD = struct.Struct("<IHB")  # loop, bot id, kind
+LEVEL = struct.Struct("<bdqdq")  # side (+1 buy / -1 sell), price, size, order id, tick
+ORDER_REC = struct.Struct("<H")  # ticker id, then a LEVEL
+QUOTE_REC = struct.Struct("<HI")  # ticker id, number of levels
+REMOVE_REC = struct.Struct("<d")  # order id
+CONVERSION_REC = struct.Struct("<HHq")  # start ticker id, end ticker id (0xFFFF = BASKET), quantity
+NO_TICKER = 0xFFFF
+SIDES = {"Buy": 1, "Sell": -1}
+SIDE_NAMES = {1: "Buy", -1: "Sell"}
+
+
+class FlowWriter:
+    """Appends the market bots' messages to a binary flow log, turn by turn."""
+    def __init__(self, path: str, bot_names, products, seed, players=()):
+        tickers = [p.ticker for p in products]
+        self.ticker_to_product = {p.ticker: p for p in products}
+        self.bot_ids = {name: i for i, name in enumerate(bot_names)}
+        self.ticker_ids = {ticker: i for i, ticker in enumerate(tickers)}
+        self.ticker_ids[BASKET] = NO_TICKER
+        self.file = open(path, "wb")
+        meta = json.dumps({"bots": list(bot_names), "tickers": list(tickers), "seed": seed, "players": list(players)}).encode()
+        self.file.write(MAGIC + struct.pack("<HI", VERSION, len(meta)) + meta)
+        self.end_loop = struct.Struct(f"<{2 * len(tickers)}d")
+
+    def write_message(self, loop_num: int, bot_name: str, msg):
+        """Log one accepted message, before the exchange changes its orders."""
+        bot_id = self.bot_ids[bot_name]
+        if msg.msg_type == "ORDER":
+            order = msg.message
+            self.file.write(HEAD.pack(loop_num, bot_id, ORDER) + ORDER_REC.pack(self.ticker_ids[order.ticker])
+                            + LEVEL.pack(SIDES[order.agg_dir], order.price, order.size, order.order_id, self.tick(order)))
+        elif msg.msg_type == "QUOTE_UPDATE":
+            quote = msg.message
+            parts = [HEAD.pack(loop_num, bot_id, QUOTE) + QUOTE_REC.pack(self.ticker_ids[quote.ticker], len(quote.orders))]
+            parts.extend(LEVEL.pack(SIDES[o.agg_dir], o.price, o.size, o.order_id, self.tick(o)) for o in quote.orders)
+            self.file.write(b"".join(parts))
+        elif msg.msg_type == "REMOVE":
+            self.file.write(HEAD.pack(loop_num, bot_id, REMOVE) + REMOVE_REC.pack(msg.message))
+        elif msg.msg_type == "CONVERSION":
+            convert = msg.message
+            self.file.write(HEAD.pack(loop_num, bot_id, CONVERSION) + CONVERSION_REC.pack(
+                self.ticker_ids[convert.start_ticker], self.ticker_ids[convert.end_ticker], convert.quantity))
+
+    def tick(self, order) -> int:
+        """The order's tick (set by validation), worked out here for orders that didn't get one."""
+        if order.tick is not None:
+            return order.tick
+        return round(order.price * self.ticker_to_product[order.ticker].scale)
+
+    def write_loop_end(self, loop_num: int, sentiments, realisation):
+        values = [realisation[t] for t in self.ticker_ids if t != BASKET] + [sentiments[t] for t in self.ticker_ids if t != BASKET]
+        self.file.write(HEAD.pack(loop_num, 0, END_LOOP) + self.end_loop.pack(*values))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class FlowReader:
+    """
+    Reads a flow log back as it is needed. Turns come out in the order they were
+    written, so next_turn() only ever looks at the record under the cursor.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        if self.data[:4] != MAGIC:
+            raise ValueError(f"{path} is not a flow log")
+        version, meta_len = struct.unpack_from("<HI", self.data, 4)
+        if version != VERSION:
+            raise ValueError(f"Unsupported flow log version {version}")
+        meta = json.loads(self.data[10:10 + meta_len])
+        self.bot_names = meta["bots"]
+        self.tickers = meta["tickers"]
+        self.seed = meta["seed"]
+        self.players = meta.get("players", [])
+        self.offset = 10 + meta_len
+        self.bot_ids = {name: i for i, name in enumerate(self.bot_names)}
+        self.end_loop = struct.Struct(f"<{2 * len(self.tickers)}d")
+
+    def peek(self):
+        if self.offset >= len(self.data):
+            return None
+        return HEAD.unpack_from(self.data, self.offset)
+
+    def next_turn(self, loop_num: int, bot_name: str):
+        """Messages bot_name sent in loop_num (empty if it sent none)."""
+        bot_id = self.bot_ids[bot_name]
+        data = self.data
+        messages = []
+        while True:
+            head = self.peek()
+            if head is None or head[0] != loop_num or head[1] != bot_id or head[2] == END_LOOP:
+                return messages
+            kind = head[2]
+            at = self.offset + HEAD.size
+            if kind == ORDER:
+                (ticker_id,) = ORDER_REC.unpack_from(data, at)
+                side, price, size, order_id, tick = LEVEL.unpack_from(data, at + ORDER_REC.size)
+                order = Order(self.tickers[ticker_id], price, size, order_id, SIDE_NAMES[side], bot_name)
+                order.tick = tick
+                messages.append(Msg("ORDER", order))
+                at += ORDER_REC.size + LEVEL.size
+            elif kind == QUOTE:
+                ticker_id, n = QUOTE_REC.unpack_from(data, at)
+                at += QUOTE_REC.size
+                ticker = self.tickers[ticker_id]
+                orders = []
+                for side, price, size, order_id, tick in LEVEL.iter_unpack(data[at:at + n * LEVEL.size]):
+                    order = Order(ticker, price, size, order_id, SIDE_NAMES[side], bot_name)
+                    order.tick = tick
+                    orders.append(order)
+                messages.append(Msg("QUOTE_UPDATE", QuoteUpdate(ticker, orders, bot_name)))
+                at += n * LEVEL.size
+            elif kind == REMOVE:
+                (order_id,) = REMOVE_REC.unpack_from(data, at)
+                messages.append(Msg("REMOVE", order_id))
+                at += REMOVE_REC.size
+            else:
+                start, end, quantity = CONVERSION_REC.unpack_from(data, at)
+                messages.append(Msg("CONVERSION", ConversionRequest(self.ticker_name(start), self.ticker_name(end), quantity)))
+                at += CONVERSION_REC.size
+            self.offset = at
+
+    def ticker_name(self, ticker_id: int) -> str:
+        return BASKET if ticker_id == NO_TICKER else self.tickers[ticker_id]
+
+    def loop_end(self, loop_num: int):
+        """(realisation, sentiments) at the end of loop_num."""
+        head = self.peek()
+        if head is None or head[0] != loop_num or head[2] != END_LOOP:
+            raise ValueError(f"Flow log is out of step at loop {loop_num}")
+        values = self.end_loop.unpack_from(self.data, self.offset + HEAD.size)
+        self.offset += HEAD.size + self.end_loop.size
+        n = len(self.tickers)
+        return dict(zip(self.tickers, values[:n])), dict(zip(self.tickers, values[n:]))
+
+
+class ReplayedBot:
+    """Stands in for a recorded market bot: sends back what it sent in the recorded game."""
+    def __init__(self, name: str, reader: FlowReader):
+        self.name = name
+        self.reader = reader
+
+    def set_idx(self, idx):
+        pass
+
+    def send_messages(self, book_state, sentiments, realisation, loop_num):
+        return self.reader.next_turn(loop_num, self.name), sentiments, realisation
+
+    def process_trades(self, trades, realisation):
+        return realisation
+
+
+class ReplayGame(Game):
+    """
+    A Game whose market bots are replayed from a flow log. players are the live player
+    bots; every other bot recorded in the log is replayed. The turn order is the
+    recorded one. A player whose name isn't in the log takes the place of a recorded
+    player it doesn't share a name with. Other keywords go to Game; the seed defaults
+    to the recorded one.
+    """
+    def __init__(self, products, flow_path: str, players, **kwargs):
+        self.reader = FlowReader(flow_path)
+        live = {bot.name: bot for bot in players}
+        names = list(self.reader.bot_names)
+        new = [name for name in live if name not in names]
+        if new:
+            free = [name for name in self.reader.players if name not in live]
+            if len(free) < len(new):
+                raise ValueError(f"Players {new} aren't in the flow log and it has no recorded player slots left for them")
+            slots = dict(zip(free, new))
+            names = [slots.get(name, name) for name in names]
+        bots = [live[name] if name in live else ReplayedBot(name, self.reader) for name in names]
+        kwargs.setdefault("seed", self.reader.seed)
+        super().__init__(products, bots, player_bots=list(live), **kwargs)
+
+    def initialise_game(self):
+        # market bots' order ids are in the log; only the players need id bases
+        start_idx = 0
+        for bot in self.bots.values():
+            if bot.name in self.player_bots:
+                bot.set_idx(start_idx)
+            start_idx += 10e6
+
+    def process_messages(self, bot_name, bot, messages, loop_num):
+        """
+        The replayed flow was validated when it was recorded and carries its ticks, so it
+        goes straight to the exchange; only the live players' messages are validated.
+        """
+        if bot_name in self.player_bots:
+            return super().process_messages(bot_name, bot, messages, loop_num)
+        exchange = self.exchange
+        turn_trades = []
+        for msg in messages:
+            if msg.msg_type == "ORDER":
+                turn_trades += exchange.process_order(loop_num, msg.message)
+            elif msg.msg_type == "QUOTE_UPDATE":
+                turn_trades += exchange.update_quotes(loop_num, msg.message)
+            elif msg.msg_type == "REMOVE":
+                exchange.remove_order(msg.message)
+            elif self.validate_conversion(bot_name, msg.message):
+                # checked again: holdings can differ from the recording when the player does
+                self.perform_conversion(bot_name, msg.message, loop_num)
+        self.track_positions(turn_trades)
+        return turn_trades
+
+    def record_state(self, loop_num):
+        self.realisation, self.sentiments = self.reader.loop_end(loop_num)
+        super().record_state(loop_num)
@@ -0,0 +1,73 @@
+import math
+import zlib
+from bisect import bisect_right
+from itertools import accumulate
+
+import numpy as np
+
+
+class RandomStream:
+    """
+    A bot's private source of randomness, built on numpy Generators.
+
+    Uniforms, exponentials and normals each come from their own child Generator and
+    are pre-sampled `block` at a time, so a bot pays one numpy call per block instead
+    of one per draw. Because each distribution has its own stream, the values a bot
+    sees don't depend on the block size or on how it interleaves its draws.
+    """
+    def __init__(self, seed=None, block: int = 1024):
+        seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.seed_seq = seed_seq
+        self.block = block
+        self.uniform_gen, self.exponential_gen, self.normal_gen = (np.random.default_rng(s) for s in seed_seq.spawn(3))
+        self.uniforms, self.exponentials, self.normals = [], [], []
+        self.u_idx = self.e_idx = self.n_idx = 0
+        self.geometric_gen = None  # spawned on first use, so streams that never need it are unchanged
+        self.geometric_uniforms = []
+        self.g_idx = 0
+
+    @classmethod
+    def for_bot(cls, game_seed, bot_name: str, block: int = 1024):
+        """The stream for one bot of a game. Keyed on the bot's name, so adding a bot leaves the others' streams alone."""
+        return cls(np.random.SeedSequence(game_seed, spawn_key=(zlib.crc32(bot_name.encode()),)), block)
+
+    def random(self) -> float:
+        """Uniform on [0, 1)."""
+        if self.u_idx == len(self.uniforms):
+            self.uniforms = self.uniform_gen.random(self.block).tolist()
+            self.u_idx = 0
+        self.u_idx += 1
+        return self.uniforms[self.u_idx - 1]
+
+    def exponential(self, scale: float = 1.0) -> float:
+        if self.e_idx == len(self.exponentials):
+            self.exponentials = self.exponential_gen.standard_exponential(self.block).tolist()
+            self.e_idx = 0
+        self.e_idx += 1
+        return scale * self.exponentials[self.e_idx - 1]
+
+    def normal(self, loc: float = 0.0, scale: float = 1.0) -> float:
+        if self.n_idx == len(self.normals):
+            self.normals = self.normal_gen.standard_normal(self.block).tolist()
+            self.n_idx = 0
+        self.n_idx += 1
+        return loc + scale * self.normals[self.n_idx - 1]
+
+    def geometric(self, p: float) -> int:
+        """Number of Bernoulli(p) trials up to and including the first success (>= 1); inf for p <= 0."""
+        if p <= 0:
+            return math.inf
+        if p >= 1:
+            return 1
+        if self.g_idx == len(self.geometric_uniforms):
+            if self.geometric_gen is None:
+                self.geometric_gen = np.random.default_rng(self.seed_seq.spawn(1)[0])
+            self.geometric_uniforms = self.geometric_gen.random(self.block).tolist()
+            self.g_idx = 0
+        self.g_idx += 1
+        return int(math.log1p(-self.geometric_uniforms[self.g_idx - 1]) // math.log1p(-p)) + 1
+
+    def choices(self, population, weights):
+        """One weighted pick, made the same way as random.choices(population, weights)[0]."""
+        cum_weights = list(accumulate(weights))
+        return population[bisect_right(cum_weights, self.random() * cum_weights[-1], 0, len(population) - 1)]
@@ -0,0 +1,174 @@
+"""
+Monte Carlo runner: play many games over a grid of bot parameters and seeds in parallel.
+
+Each game runs in its own worker process from its own game seed and sends back a small
+summary dict (final PnL per bot, traded volume, mid-price path statistics), so the
+only thing crossing process boundaries is a few numbers per game.
+
+    python runner.py --seeds 0-99 --iterations 20000 --grid '{"taker_params.freq.UEC": [0.001, 0.01]}'
+"""
+import argparse
+import copy
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from analytics import Analytics
+from base import Product
+from bots import MarketMaker, RandomTrader, Reverter, Taker
+from game import Game
+from your_algo import PlayerAlgorithm
+
+
+BOT_TYPE_TO_CLASS = {
+    "market_maker": MarketMaker,
+    "random_trader": RandomTrader,
+    "reverter": Reverter,
+    "taker": Taker
+}
+
+
+def make_bots(bot_params: Dict, products: List[Product]) -> List:
+    """Build the market bots from a bot_parameters.json style dict, as playing.py does."""
+    bots = []
+    for bot_name, params in bot_params.items():
+        params = params.copy()
+        params["products"] = products
+        bot_class = BOT_TYPE_TO_CLASS[params.pop("bot_type")]
+        bots.append(bot_class(**params))
+    return bots
+
+
+def apply_overrides(bot_params: Dict, overrides: Dict) -> Dict:
+    """Copy of bot_params with dotted-path overrides, e.g. {"taker_params.freq.UEC": 0.01}."""
+    bot_params = copy.deepcopy(bot_params)
+    for path, value in overrides.items():
+        *parents, leaf = path.split(".")
+        target = bot_params
+        for key in parents:
+            target = target[key]
+        target[leaf] = value
+    return bot_params
+
+
+def expand_grid(grid: Dict) -> List[Dict]:
+    """{"a": [1, 2], "b": [3]} -> [{"a": 1, "b": 3}, {"a": 2, "b": 3}]"""
+    if not grid:
+        return [{}]
+    paths = list(grid)
+    return [dict(zip(paths, values)) for values in itertools.product(*(grid[p] for p in paths))]
+
+
+def summarise(game: Game, bot_params: Dict) -> Dict:
+    analysis = Analytics(game, bot_params)
+    summary = {"volume": analysis.volume().to_dict(), "mids": {}, "pnl": {}}
+
+    final_mids = {}
+    for product in game.products:
+        mids = np.array(game.record[product.ticker], dtype=float)
+        valid = mids[~np.isnan(mids)]
+        if len(valid) == 0:
+            final_mids[product.ticker] = np.nan
+            summary["mids"][product.ticker] = None
+            continue
+        returns = np.diff(np.log(valid))
+        final_mids[product.ticker] = valid[-1]
+        summary["mids"][product.ticker] = {
+            "final": valid[-1],
+            "mean": valid.mean(),
+            "std": valid.std(),
+            "min": valid.min(),
+            "max": valid.max(),
+            "return_std": returns.std() if len(returns) else 0.0,
+        }
+
+    # mark every bot's positions to the last mid
+    for bot_name, positions in game.positions.items():
+        pnl = positions["Cash"]
+        for ticker, mid in final_mids.items():
+            if positions[ticker]:
+                pnl += positions[ticker] * mid
+        summary["pnl"][bot_name] = pnl
+    return summary
+
+
+def run_game(bot_params: Dict, products: List[Product], seed: int, iterations: int,
+             overrides: Dict = None, include_player: bool = True) -> Dict:
+    """Play one game from scratch; every bot's random stream is derived from seed."""
+    params = apply_overrides(bot_params, overrides or {})
+    bots = make_bots(params, products)
+    player_bots = []
+    if include_player:
+        player = PlayerAlgorithm(products)
+        bots = [player] + bots
+        player_bots = [player.name]
+
+    game = Game(products, bots, player_bots=player_bots, seed=seed)
+    game.play_game(iterations)
+
+    summary = summarise(game, params)
+    summary["seed"] = seed
+    summary["overrides"] = overrides or {}
+    return summary
+
+
+def run_sweep(bot_params: Dict, products: List[Product], seeds: List[int], iterations: int,
+              grid: Dict = None, max_workers: int = None, include_player: bool = True) -> Iterator[Dict]:
+    """
+    Play one game per (grid point, seed) across a process pool, yielding each summary
+    as soon as its game finishes (so not in submission order).
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(run_game, bot_params, products, seed, iterations, overrides, include_player)
+            for overrides in expand_grid(grid or {})
+            for seed in seeds
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def parse_seeds(text: str) -> List[int]:
+    """'0-99' or '1,5,9'"""
+    if "-" in text:
+        start, stop = text.split("-")
+        return list(range(int(start), int(stop) + 1))
+    return [int(s) for s in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many games in parallel and stream JSON summaries.")
+    parser.add_argument("--params", default="bot_parameters.json")
+    parser.add_argument("--grid", default="{}", help="JSON dict of dotted parameter path -> list of values")
+    parser.add_argument("--seeds", default="0-7")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default=None, help="append summaries to this .jsonl file instead of stdout")
+    parser.add_argument("--no-player", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.params) as f:
+        bot_params = json.load(f)
+    products = [Product("UEC", mpv=0.1)]
+
+    out = open(args.out, "a") if args.out else None
+    try:
+        for summary in run_sweep(bot_params, products, parse_seeds(args.seeds), args.iterations,
+                                 json.loads(args.grid), args.workers, not args.no_player):
+            line = json.dumps(summary, default=float)
+            if out:
+                out.write(line + "\n")
+                out.flush()
+            else:
+                print(line, flush=True)
+    finally:
+        if out:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Event-driven turn scheduling: only bots with something to do get a send_messages call.
+
+A bot opts in by defining wake_conditions(), returning any of the conditions below;
+it is woken when any of them holds. Bots without wake_conditions take a turn every
+loop, exactly as without the scheduler. Every bot gets a turn on the first loop.
+Conditions are checked at the bot's place in the turn order, so they see everything
+the bots before it did in the same loop.
+"""
+import heapq
+
+
+class Timer:
+    """
+    Wake at the loop returned by bot.next_wake(loop_num), asked again after every turn.
+    Bots use this for trades that happen at random, drawing the gap to their next one
+    from a geometric distribution instead of a coin flip every loop.
+    """
+
+
+class SentimentBeyond:
+    """Wake while |sentiments[ticker]| >= threshold."""
+    def __init__(self, ticker: str, threshold: float):
+        self.ticker = ticker
+        self.threshold = threshold
+
+
+class BookChange:
+    """Wake when ticker's book has changed since the end of the bot's last turn."""
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+
+
+class Traded:
+    """Wake when the bot is party to a trade: later this loop if its turn is still to come, else next loop."""
+
+
+class Pending:
+    """Wake next loop if bot.pending() is true at the end of its turn, e.g. it has orders left to cancel."""
+
+
+class Scheduler:
+    """
+    Timed and traded wake-ups are kept in a heap of (loop, turn order, bot name), so
+    bots that are asleep cost nothing per loop. Only bots with a sentiment or book
+    condition (or none at all) are looked at every loop, one comparison each.
+    """
+    def __init__(self, game):
+        self.game = game
+        self.order = list(game.bots.items())  # turn order, as in the unscheduled game
+        self.pos = {name: pos for pos, (name, _) in enumerate(self.order)}
+        self.sentiment_conditions = {}  # bot name → [SentimentBeyond]
+        self.book_conditions = {}  # bot name → [BookChange]
+        self.watched = []  # turn positions of bots checked every loop
+        self.timed = set()
+        self.pending = set()
+        self.traded = set()
+        self.heap = []  # (loop, pos, name) wake-ups; stale entries are skipped via wake_at
+        self.wake_at = {}  # bot name → loop of its live heap entry
+        self.seen_versions = {}  # bot name → {ticker: book version at the end of its last turn}
+        self.loop = None  # loop being played
+        self.current = []  # heap of turn positions still due this loop
+        self.due = set()  # turn positions woken this loop regardless of their watched conditions
+        self.current_pos = -1
+
+        book_view = game.exchange.book_view
+        for pos, (name, bot) in enumerate(self.order):
+            conditions = bot.wake_conditions() if hasattr(bot, "wake_conditions") else None
+            if conditions is None:
+                self.watched.append(pos)
+                continue
+            sentiment = [c for c in conditions if isinstance(c, SentimentBeyond)]
+            book = [c for c in conditions if isinstance(c, BookChange)]
+            if sentiment or book:
+                self.watched.append(pos)
+            if sentiment:
+                self.sentiment_conditions[name] = sentiment
+            if book:
+                self.book_conditions[name] = book
+                self.seen_versions[name] = {c.ticker: book_view.version(c.ticker) for c in book}
+            if any(isinstance(c, Timer) for c in conditions):
+                self.timed.add(name)
+            if any(isinstance(c, Pending) for c in conditions):
+                self.pending.add(name)
+            if any(isinstance(c, Traded) for c in conditions):
+                self.traded.add(name)
+
+    def start(self, loop_num: int):
+        for pos, (name, bot) in enumerate(self.order):
+            self.push(name, loop_num)
+
+    def push(self, name: str, loop_num):
+        """Wake name at loop_num (keeps the earlier of this and any wake-up already queued)."""
+        if loop_num is None or loop_num == float("inf"):
+            return
+        queued = self.wake_at.get(name)
+        if queued is not None and queued <= loop_num:
+            return
+        self.wake_at[name] = loop_num
+        heapq.heappush(self.heap, (loop_num, self.pos[name], name))
+
+    def wake(self, name: str):
+        """Called by the game when name has traded."""
+        if name not in self.traded:
+            return
+        pos = self.pos[name]
+        if self.loop is not None and pos > self.current_pos:
+            heapq.heappush(self.current, pos)  # its turn hasn't come yet this loop
+            self.due.add(pos)
+        else:
+            self.push(name, (self.loop if self.loop is not None else 0) + 1)
+
+    def awake(self, name: str) -> bool:
+        if name not in self.sentiment_conditions and name not in self.book_conditions:
+            return True  # no wake conditions: every loop
+        sentiments = self.game.sentiments
+        for condition in self.sentiment_conditions.get(name, ()):
+            if abs(sentiments[condition.ticker]) >= condition.threshold:
+                return True
+        book_view = self.game.exchange.book_view
+        for condition in self.book_conditions.get(name, ()):
+            if book_view.version(condition.ticker) != self.seen_versions[name][condition.ticker]:
+                return True
+        return False
+
+    def turns(self, loop_num: int):
+        """Yield (bot name, bot) for every bot due this loop, in turn order."""
+        heap = self.heap
+        current = []
+        due = self.due = set()
+        while heap and heap[0][0] <= loop_num:
+            wake_loop, pos, name = heapq.heappop(heap)
+            if self.wake_at.get(name) == wake_loop:
+                del self.wake_at[name]
+                due.add(pos)
+                current.append(pos)
+        current.extend(self.watched)
+        heapq.heapify(current)
+        self.current = current
+        self.loop = loop_num
+        self.current_pos = -1
+
+        try:
+            while current:
+                pos = heapq.heappop(current)
+                if pos <= self.current_pos:
+                    continue  # already had its turn (queued more than once)
+                self.current_pos = pos
+                name, bot = self.order[pos]
+                if pos not in due and not self.awake(name):
+                    continue
+                yield name, bot
+
+                # the bot's turn (including trade fan-out) is over
+                if name in self.seen_versions:
+                    book_view = self.game.exchange.book_view
+                    seen = self.seen_versions[name]
+                    for ticker in seen:
+                        seen[ticker] = book_view.version(ticker)
+                if name in self.timed:
+                    self.push(name, bot.next_wake(loop_num + 1))
+                if name in self.pending and bot.pending():
+                    self.push(name, loop_num + 1)
+        finally:
+            self.loop = None
@@ -0,0 +1,33 @@
+import numpy as np
+
+from analytics import Analytics
+from base import Product
+from game import Game
+from test_game import shipped_bots
+from your_algo import PlayerAlgorithm
+
+
+def played(**kwargs):
+    products = [Product("UEC", mpv=0.1)]
+    player = PlayerAlgorithm(products)
+    game = Game(products, [player] + shipped_bots(products), player_bots=[player.name], seed=1, **kwargs)
+    game.play_game(500)
+    return Analytics(game, {})
+
+
+def test_future_mids_come_from_after_the_trade():
+    analytics = played(record_every=10)
+    cols = analytics.trade_columns()
+    mids = analytics.future_mids(cols["loop"], cols["ticker_id"], 1)
+    record = analytics.record_frame()["UEC"]
+    for loop, mid in zip(cols["loop"].tolist(), mids.tolist()):
+        later = record[record.index >= loop + 1]  # record_every=10, so usually several loops on
+        if later.empty:
+            assert np.isnan(mid)
+        else:
+            assert mid == later.iloc[0]
+
+
+def test_markouts_ignore_fills_without_a_future_mid():
+    markouts = played().markouts(horizons=(100,))
+    assert not (markouts["markout_100"] == 0.0).any()
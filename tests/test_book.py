@@ -0,0 +1,76 @@
+"""
+The price-level book against the original list book (bench_book.ListExchange): the
+same random stream of adds, crossing orders and cancels must leave both books in the
+same order and produce the same trades, and open_orders must match the resting sizes.
+"""
+import random
+
+import pytest
+
+from base import Exchange, Order, Product
+from bench_book import ListExchange
+
+BOTS = ("a", "b", "c")
+
+
+def resting(side):
+    return [(rest.order_id, rest.size, rest.bot_name) for rest in side]
+
+
+def open_sizes(exchange):
+    sizes = {}
+    for index, side in ((0, "Bids"), (1, "Asks")):
+        for rest in exchange.book["X"][side]:
+            sizes.setdefault((rest.bot_name, "X"), [0, 0])[index] += rest.size
+    return sizes
+
+
+def check_side(side):
+    live = [rest for level in side.iter_levels() for rest in level]
+    assert side.order_count == len(live)
+    assert side.top is (live[0] if live else None)
+    for level in side.iter_levels():
+        assert level.count == sum(1 for _ in level) > 0
+        assert level.volume == sum(rest.size for rest in level)
+        assert level.orders[0].size > 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_list_book(seed):
+    rng = random.Random(seed)
+    products = [Product("X")]
+    new, old = Exchange(products), ListExchange(products)
+    live = []
+    for order_id in range(3000):
+        if live and rng.random() < 0.4:
+            cancel = live.pop(rng.randrange(len(live)))
+            new.remove_order(cancel)
+            if cancel in {rest.order_id for side in old.book["X"].values() for rest in side}:
+                old.remove_order(cancel)
+        else:
+            agg_dir = rng.choice(("Buy", "Sell"))
+            # mostly passive, sometimes crossing a few levels
+            price = 100 + rng.randint(-20, 20) + (-3 if agg_dir == "Buy" else 3)
+            size, bot = rng.randint(1, 8), rng.choice(BOTS)
+            new_trades = new.process_order(0, Order("X", price, size, order_id, agg_dir, bot))
+            old_trades = old.process_order(0, Order("X", price, size, order_id, agg_dir, bot))
+            assert [(t.rest_order_id, t.price, t.size) for t in new_trades] == \
+                   [(t.rest_order_id, t.price, t.size) for t in old_trades]
+            live.append(order_id)
+
+        for side in ("Bids", "Asks"):
+            assert resting(new.book["X"][side]) == resting(old.book["X"][side])
+            check_side(new.book["X"][side])
+        expected = open_sizes(old)
+        assert {key: value for key, value in new.open_orders.items() if value != [0, 0]} == expected
+
+
+def test_cancelled_orders_behind_a_resting_front_are_compacted():
+    exchange = Exchange([Product("X")])
+    exchange.process_order(0, Order("X", 100, 5, 0, "Buy", "a"))
+    for order_id in range(1, 10001):
+        exchange.process_order(0, Order("X", 100, 5, order_id, "Buy", "a"))
+        exchange.remove_order(order_id)
+    level = exchange.book["X"]["Bids"].levels[100]
+    assert level.count == 1
+    assert len(level.orders) < 100
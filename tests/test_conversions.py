@@ -0,0 +1,56 @@
+import numpy as np
+
+from base import Product
+from bots import Msg
+from game import ConversionRequest, Game
+
+
+class Converter:
+    name = "p"
+
+    def __init__(self, requests):
+        self.requests = requests
+        self.converted = []
+        self.rejected = []
+
+    def set_idx(self, idx):
+        pass
+
+    def send_messages(self, book):
+        requests, self.requests = self.requests, []
+        return [Msg("CONVERSION", request) for request in requests]
+
+    def process_trades(self, trades):
+        pass
+
+    def process_conversions(self, conversion):
+        self.converted.append(conversion)
+
+    def process_rejection(self, message, reason):
+        self.rejected.append(reason)
+
+
+def play(requests, holdings):
+    products = [Product("A", conversions={"B": 2}), Product("B")]
+    bot = Converter(requests)
+    game = Game(products, [bot], player_bots=["p"], seed=0)
+    game.positions["p"].update(holdings)
+    game.play_game(1)
+    return game, bot
+
+
+def test_numpy_quantities_convert():
+    game, bot = play([ConversionRequest("A", "B", np.int64(3))], {"A": 5})
+    assert len(bot.converted) == 1
+    assert game.positions["p"]["A"] == 2 and game.positions["p"]["B"] == 6
+
+
+def test_bad_conversions_are_rejected_not_raised():
+    requests = [ConversionRequest("A", "B", 10),  # more than held
+                ConversionRequest("A", "Z", 1),  # unknown product
+                ConversionRequest("B", "A", 1),  # no path
+                ConversionRequest("A", "B", 1.5),  # not whole
+                ConversionRequest("A", "B", -1)]
+    game, bot = play(requests, {"A": 5})
+    assert len(bot.rejected) == 5 and game.rejections["p"] == 5
+    assert game.positions["p"]["A"] == 5 and game.positions["p"]["B"] == 0
@@ -0,0 +1,39 @@
+import json
+import os
+
+from base import Order, Product, QuoteUpdate
+from bots import Msg
+from game import Game
+from runner import make_bots
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def shipped_bots(products):
+    with open(os.path.join(ROOT, "bot_parameters.json")) as f:
+        return make_bots(json.load(f), products)
+
+
+class Spoofer:
+    """A player that sends messages in the market maker's and the whale's names."""
+    name = "PlayerAlgorithm"
+
+    def set_idx(self, idx):
+        self.idx = idx
+
+    def send_messages(self, book):
+        self.idx += 1
+        return [Msg("QUOTE_UPDATE", QuoteUpdate("UEC", [], "market_maker")),
+                Msg("ORDER", Order("UEC", 50.0, 5, self.idx, "Buy", "whale"))]
+
+    def process_trades(self, trades):
+        pass
+
+
+def test_messages_in_another_bots_name_are_rejected():
+    products = [Product("UEC", mpv=0.1)]
+    game = Game(products, [Spoofer()] + shipped_bots(products), player_bots=["PlayerAlgorithm"], seed=1)
+    game.play_game(5)
+    assert game.rejections["PlayerAlgorithm"] == 10
+    assert game.exchange.quote_volume("market_maker", "UEC") != (0, 0)
+    assert game.exchange.open_orders.get(("whale", "UEC"), [0, 0]) == [0, 0]
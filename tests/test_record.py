@@ -0,0 +1,48 @@
+import pytest
+
+from analytics import Analytics
+from base import Product
+from game import Game
+from test_game import shipped_bots
+from your_algo import PlayerAlgorithm
+
+
+def streamed_game(path):
+    products = [Product("UEC", mpv=0.1)]
+    player = PlayerAlgorithm(products)
+    return Game(products, [player] + shipped_bots(products), player_bots=[player.name], seed=1,
+                record_path=str(path), record_chunk=300)
+
+
+@pytest.mark.parametrize("name", ["record.csv", "record.npy", "record"])
+def test_analytics_reads_a_streamed_record_back(tmp_path, name):
+    game = streamed_game(tmp_path / name)
+    game.play_game(1000)
+    assert game.record.n < 1000  # most rows are on disk
+    analytics = Analytics(game, {})
+    assert len(analytics.record_frame()) == 1000
+    game.close()
+    game.play_game(100)  # kept in memory from here on
+    assert len(analytics.mark_to_market()) == 1100
+
+
+def test_open_parquet_record_is_not_read_back(tmp_path):
+    pytest.importorskip("pyarrow")
+    game = streamed_game(tmp_path / "record.parquet")
+    game.play_game(500)
+    with pytest.raises(ValueError):
+        Analytics(game, {}).record_frame()
+    game.close()
+    assert len(Analytics(game, {}).record_frame()) == 500
+
+
+def test_with_block_finishes_a_parquet_record_after_a_crash(tmp_path):
+    pytest.importorskip("pyarrow")
+    from recorder import load_record
+
+    path = tmp_path / "record.parquet"
+    with pytest.raises(RuntimeError):
+        with streamed_game(path) as game:
+            game.play_game(500)
+            raise RuntimeError("crash")
+    assert len(load_record(str(path))) == 500
@@ -0,0 +1,62 @@
+import pytest
+
+from base import Product
+from game import Game
+from replay import ReplayGame
+from test_game import shipped_bots
+from your_algo import PlayerAlgorithm
+
+
+def products():
+    return [Product("UEC", mpv=0.1, pos_limit=1000)]
+
+
+def record(path, loops=3000, seed=7):
+    game_products = products()
+    player = PlayerAlgorithm(game_products)
+    with Game(game_products, [player] + shipped_bots(game_products), player_bots=[player.name], seed=seed,
+              exempt_bots=["market_maker"], record_flow=str(path)) as game:
+        game.play_game(loops)
+    return game
+
+
+def replay(path, player, loops=3000):
+    game = ReplayGame(products(), str(path), [player], exempt_bots=["market_maker"])
+    game.play_game(loops)
+    return game
+
+
+def test_replay_with_limits_reproduces_the_recorded_game(tmp_path):
+    recorded = record(tmp_path / "flow.bin")
+    assert sum(recorded.rejections.values()) > 0  # rejected orders must not come back in the replay
+    replayed = replay(tmp_path / "flow.bin", PlayerAlgorithm(products()))
+    assert replayed.positions == recorded.positions
+    assert replayed.record.to_frame().equals(recorded.record.to_frame())
+    assert replayed.trade_log.to_pandas().equals(recorded.trade_log.to_pandas())
+
+
+class MyAlgo(PlayerAlgorithm):
+    def __init__(self, products):
+        super().__init__(products)
+        self.name = "MyAlgo"
+        self.turns = 0
+
+    def send_messages(self, book):
+        self.turns += 1
+        return super().send_messages(book)
+
+
+def test_renamed_player_takes_the_recorded_players_turns(tmp_path):
+    recorded = record(tmp_path / "flow.bin", loops=100)
+    player = MyAlgo(products())
+    replayed = replay(tmp_path / "flow.bin", player, loops=100)
+    assert player.turns == 100
+    assert list(replayed.bots)[0] == "MyAlgo"
+    assert replayed.positions["whale"] == recorded.positions["whale"]
+
+
+def test_extra_player_without_a_slot_is_refused(tmp_path):
+    record(tmp_path / "flow.bin", loops=10)
+    extra = MyAlgo(products())
+    with pytest.raises(ValueError):
+        ReplayGame(products(), str(tmp_path / "flow.bin"), [PlayerAlgorithm(products()), extra])
@@ -0,0 +1,52 @@
+import pickle
+import pickletools
+
+import pytest
+
+from base import Product
+from continuous import ContinuousGame
+from game import Game
+from snapshot import fork, restore, snapshot
+from test_game import shipped_bots
+from your_algo import PlayerAlgorithm
+
+
+def new_game(game_class, **kwargs):
+    products = [Product("UEC", mpv=0.1)]
+    player = PlayerAlgorithm(products)
+    return game_class(products, [player] + shipped_bots(products), player_bots=[player.name], seed=1, **kwargs)
+
+
+@pytest.mark.parametrize("game_class, kwargs", [
+    (Game, {}),
+    (Game, {"schedule": True}),
+    (ContinuousGame, {"latency": {"market_maker": (0.1, 0.05)}, "jitter": 0.02}),
+])
+def test_restored_game_plays_on_like_the_original(game_class, kwargs):
+    straight = new_game(game_class, **kwargs)
+    straight.play_game(600)
+    game = new_game(game_class, **kwargs)
+    game.play_game(300)
+    restored = restore(snapshot(game))
+    restored.play_game(300)
+    assert restored.positions == straight.positions
+    assert restored.record.to_frame().equals(straight.record.to_frame())
+    assert restored.trade_log.to_pandas().equals(straight.trade_log.to_pandas())
+
+
+def test_snapshots_hold_no_itertools_objects():
+    # pickling itertools objects is gone in Python 3.14
+    game = new_game(ContinuousGame)
+    game.play_game(10)
+    ops = {arg for _, arg, _ in pickletools.genops(pickle.dumps(game, protocol=5)) if isinstance(arg, str)}
+    assert "itertools" not in ops
+
+
+def test_forks_with_different_seeds_diverge():
+    game = new_game(Game)
+    game.play_game(300)
+    first, second = fork(snapshot(game), seeds=[5, 6])
+    first.play_game(300)
+    second.play_game(300)
+    assert first.loop == second.loop == 600
+    assert first.positions != second.positions
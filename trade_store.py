@@ -0,0 +1,98 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+class TradeStore:
+    """
+    Append-only columnar trade log. Each column is a preallocated NumPy array that
+    doubles when full; to_numpy / to_pandas / loop_range hand out views of the filled
+    part rather than copies.
+
+    Tickers and bot names are stored as small integer ids; ticker_names and bot_names
+    map them back.
+    """
+    COLUMNS = {
+        "loop": np.int64,
+        "ticker_id": np.int32,
+        "price": np.float64,
+        "size": np.int64,
+        "agg_side": np.int8,  # 1 aggressor bought, -1 aggressor sold
+        "agg_bot_id": np.int32,
+        "rest_bot_id": np.int32,
+    }
+    MAPPING = {"Buy": 1, "Sell": -1}
+
+    def __init__(self, tickers: List[str], capacity: int = 1024):
+        self.ticker_names = list(tickers)
+        self.ticker_ids = {t: i for i, t in enumerate(self.ticker_names)}
+        self.bot_names = []
+        self.bot_ids = {}
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.n = 0
+
+    def bot_id(self, bot_name: str) -> int:
+        bot_id = self.bot_ids.get(bot_name)
+        if bot_id is None:
+            bot_id = len(self.bot_names)
+            self.bot_ids[bot_name] = bot_id
+            self.bot_names.append(bot_name)
+        return bot_id
+
+    def grow(self):
+        capacity = max(2 * len(self.columns["loop"]), 1024)
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.n] = column[:self.n]
+            self.columns[name] = grown
+
+    def append(self, loop_num: int, ticker: str, price: float, size: int,
+               agg_dir: str, agg_bot: str, rest_bot: str):
+        if self.n == len(self.columns["loop"]):
+            self.grow()
+        i = self.n
+        columns = self.columns
+        columns["loop"][i] = loop_num if loop_num is not None else -1
+        columns["ticker_id"][i] = self.ticker_ids[ticker]
+        columns["price"][i] = price
+        columns["size"][i] = size
+        columns["agg_side"][i] = self.MAPPING[agg_dir]
+        columns["agg_bot_id"][i] = self.bot_id(agg_bot)
+        columns["rest_bot_id"][i] = self.bot_id(rest_bot)
+        self.n += 1
+
+    def __getstate__(self):
+        # pickle (e.g. a game snapshot) only the filled rows, not the spare capacity
+        state = self.__dict__.copy()
+        state["columns"] = {name: column[:self.n] for name, column in self.columns.items()}
+        return state
+
+    def __len__(self):
+        return self.n
+
+    def __repr__(self):
+        return f"TradeStore({self.n} trades)"
+
+    def to_numpy(self, start: int = 0, stop: int = None) -> dict:
+        """Views of each column for rows [start, stop)."""
+        stop = self.n if stop is None else min(stop, self.n)
+        return {name: column[start:stop] for name, column in self.columns.items()}
+
+    def to_pandas(self, start: int = 0, stop: int = None, names: bool = False) -> pd.DataFrame:
+        """
+        DataFrame over the column views. With names=True, ticker and bot ids are also
+        decoded into categorical columns (this part is a copy).
+        """
+        df = pd.DataFrame(self.to_numpy(start, stop), copy=False)
+        if names:
+            df["ticker"] = pd.Categorical.from_codes(df["ticker_id"], categories=self.ticker_names)
+            df["agg_bot"] = pd.Categorical.from_codes(df["agg_bot_id"], categories=self.bot_names)
+            df["rest_bot"] = pd.Categorical.from_codes(df["rest_bot_id"], categories=self.bot_names)
+        return df
+
+    def loop_range(self, start: int, stop: int) -> dict:
+        """Column views for trades with start <= loop < stop. Loops are appended in order, so this is a bisect."""
+        loops = self.columns["loop"][:self.n]
+        lo, hi = np.searchsorted(loops, [start, stop], side="left")
+        return self.to_numpy(lo, hi)
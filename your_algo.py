@@ -16,7 +16,19 @@ class PlayerAlgorithm:
         """
         So the book is of form {ticker: {Bid: [resting_orders], Ask: [resting_orders]}}. 
         The resting orders are most aggressive -> least aggresive
-        The orders are of the Rest class (view base.py). 
+        The orders are read-only RestView copies of the exchange's Rest orders (view book.py). 
+
+        book is a read-only BookView (view book.py), so it also has book.best_bid(ticker), book.best_ask(ticker),
+        book.mid(ticker), book.spread(ticker), book.levels(ticker, "Bids", n) -> (prices, sizes) numpy arrays of
+        the top n aggregated levels, and book.version(ticker) which only changes when that ticker's book does.
+
+
+        If you'd rather track the book incrementally, give your class a process_events(self, events) method.
+        Before each of your turns it is called with the MarketEvents (view feed.py) since your last turn:
+        ADD / CANCEL / FILL deltas with sequence numbers, anonymised like the trades.
+
+        Orders over your position limit are rejected rather than ending the game; give your class a
+        process_rejection(self, message, reason) method to hear about them.
         """
 
         """
@@ -33,6 +45,10 @@ class PlayerAlgorithm:
                 
         , where the message is literally the order object is msg_type == "ORDER"
         , or the order_id you'd previously sent if the msg_type == "REMOVE"   
+
+        If you quote a ladder, you can instead send one Msg("QUOTE_UPDATE", QuoteUpdate(ticker, orders, self.name))
+        per ticker with your full set of orders (view base.py). It replaces your previous ladder in that ticker,
+        and any level whose price and size haven't changed keeps its place in the queue.
         """
         messages = []
         return messages